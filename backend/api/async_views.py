@@ -0,0 +1,71 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.urls import URLPattern
+from rest_framework.permissions import SAFE_METHODS
+
+ASYNC_READ_ROUTES = {
+    'recipes-list',
+    'recipes-detail',
+    'tags-list',
+    'tags-detail',
+    'ingredients-list',
+    'ingredients-detail',
+    'users-subscriptions',
+    'recipes-download-shopping-cart',
+}
+
+
+def respond_in_thread(view, request, *args, **kwargs):
+    """Выполняет синхронный view в потоке пула и готовит тело ответа.
+
+    У каждого потока пула своё соединение с базой. Постоянные соединения
+    (``DB_CONN_MAX_AGE``) здесь не сохраняются: иначе каждый поток пула
+    держал бы своё, до ``min(32, CPU + 4)`` на воркер, и база упёрлась бы
+    в ``max_connections``. Соединение закрывается после каждого ответа.
+    Потоковый ответ Django 3.2 под ASGI читает прямо в цикле событий,
+    где курсор из этого потока уже недоступен, поэтому он собирается
+    здесь же.
+    """
+    try:
+        response = view(request, *args, **kwargs)
+        if response.streaming:
+            response.streaming_content = list(response.streaming_content)
+        elif hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        connections.close_all()
+
+
+def async_read_view(view):
+    """Асинхронная обёртка над DRF-view для ASGI.
+
+    Чтение выполняется в общем пуле потоков, и медленный запрос к базе
+    не задерживает остальные запросы воркера. Запись идёт по обычному
+    пути Django для синхронных view — в одном потоке на воркер, как того
+    требуют транзакции.
+    """
+    read = sync_to_async(respond_in_thread, thread_sensitive=False)
+    write = sync_to_async(view)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read(view, request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+    return wrapper
+
+
+def with_async_reads(urlpatterns):
+    """Подменяет view у маршрутов из ``ASYNC_READ_ROUTES``."""
+    return [
+        URLPattern(
+            pattern.pattern,
+            async_read_view(pattern.callback),
+            pattern.default_args,
+            pattern.name
+        ) if pattern.name in ASYNC_READ_ROUTES else pattern
+        for pattern in urlpatterns
+    ]
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from copy import copy
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+TOKEN_KEY = 'auth_token:{digest}'
+
+
+class LocalTokenCache:
+    """LRU токенов в памяти процесса с ограниченным сроком жизни записей."""
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.lock = Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires <= monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return user
+
+    def set(self, key, user):
+        with self.lock:
+            self.entries[key] = (user, monotonic() + self.timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+local_tokens = LocalTokenCache(
+    settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_LOCAL_TIMEOUT
+)
+
+
+def shared_tokens():
+    alias = settings.AUTH_TOKEN_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def shared_key(key):
+    return TOKEN_KEY.format(digest=sha256(key.encode()).hexdigest())
+
+
+def forget_tokens(keys):
+    """Убирает токены из обоих уровней кэша."""
+    keys = list(keys)
+    for key in keys:
+        local_tokens.delete(key)
+    shared = shared_tokens()
+    if shared is not None and keys:
+        shared.delete_many([shared_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Проверка токена без запроса к базе на прогретом кэше.
+
+    Если задан ``AUTH_TOKEN_CACHE_ALIAS``, пользователь по токену ищется
+    в этом общем кэше: сброс записи по сигналу сразу виден всем
+    воркерам. Без него используется LRU процесса, и изменения из других
+    процессов видны не позже чем через ``AUTH_TOKEN_LOCAL_TIMEOUT``
+    секунд, поэтому так можно запускать только один воркер.
+    """
+
+    def authenticate_credentials(self, key):
+        shared = shared_tokens()
+        if shared is None:
+            user = local_tokens.get(key)
+            if user is None:
+                user, _ = super().authenticate_credentials(key)
+                local_tokens.set(key, user)
+        else:
+            user = shared.get(shared_key(key))
+            if user is None:
+                user, _ = super().authenticate_credentials(key)
+                shared.set(
+                    shared_key(key), user, settings.AUTH_TOKEN_CACHE_TIMEOUT
+                )
+        user = copy(user)
+        return user, Token(key=key, user=user)
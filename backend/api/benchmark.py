@@ -0,0 +1,209 @@
+import json
+from base64 import b64encode
+from contextlib import contextmanager
+from io import StringIO
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from recipes.models import Ingredient, Tag
+
+from .synthetic import Generator, make_image
+
+User = get_user_model()
+
+BASELINES = settings.BASE_DIR / 'benchmark_baselines.json'
+
+
+def make_client(token=None):
+    host = next(
+        (host for host in settings.ALLOWED_HOSTS
+         if host and host != '*' and not host.startswith('.')),
+        'localhost'
+    )
+    headers = {'HTTP_HOST': host}
+    if token:
+        headers['HTTP_AUTHORIZATION'] = f'Token {token}'
+    return Client(**headers)
+
+
+@contextmanager
+def isolated_settings():
+    """Кэш в памяти процесса, медиафайлы во временной папке.
+
+    Изображения нарезаются в том же потоке, метрики не пишутся.
+    """
+    with TemporaryDirectory() as media, override_settings(
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'benchmark',
+        }},
+        MEDIA_ROOT=media,
+        IMAGE_WORKERS=0,
+        METRICS_SAMPLE_RATE=0,
+    ):
+        yield
+
+
+def load_reference_data():
+    """Загружает ингредиенты и теги из репозитория."""
+    call_command(
+        'load_ingredients',
+        settings.BASE_DIR / 'ingredients.json',
+        tags=settings.BASE_DIR / 'tag.json',
+        stdout=StringIO()
+    )
+
+
+@contextmanager
+def scratch_database():
+    """Временная тестовая база с ингредиентами и тегами из репозитория."""
+    old_name = connection.settings_dict['NAME']
+    with isolated_settings():
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            load_reference_data()
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def load_baselines():
+    if not BASELINES.exists():
+        return {}
+    return json.loads(BASELINES.read_text(encoding='utf-8'))
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    return timings
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+class Suite:
+    """Сценарии эталонного прогона на фиксированном наборе данных.
+
+    Каждый сценарий — запрос к API; для него запоминаются медиана времени
+    и наибольшее число SQL-запросов за повторы.
+    """
+    users = 50
+    recipes = 300
+    seed = 0
+
+    def __init__(self):
+        user_ids, recipe_ids = Generator('bench', self.seed).run(
+            self.users, self.recipes, favorites=10, cart=10,
+            subscriptions=8
+        )
+        self.user = User.objects.filter(pk__in=user_ids).annotate(
+            carts=Count('shopping_cart', distinct=True),
+            subscriptions=Count('subscriber', distinct=True)
+        ).order_by('-carts', '-subscriptions', 'pk').first()
+        self.anonymous = make_client()
+        self.client = make_client(self.user.auth_token.key)
+        self.recipe_id = recipe_ids[0]
+        self.payload = {
+            'tags': list(Tag.objects.values_list('pk', flat=True)[:2]),
+            'ingredients': [
+                {'id': pk, 'amount': 10 * number}
+                for number, pk in enumerate(
+                    Ingredient.objects.values_list('pk', flat=True)[:8], 1
+                )
+            ],
+            'name': 'Эталонный рецепт',
+            'image': 'data:image/jpeg;base64,'
+                     + b64encode(make_image()).decode(),
+            'text': 'Описание эталонного рецепта.',
+            'cooking_time': 30,
+        }
+        self.own_recipe_id = self.client.post(
+            '/api/recipes/', self.payload, content_type='application/json'
+        ).json()['id']
+
+    def recipes_list(self):
+        return self.anonymous.get('/api/recipes/?limit=6')
+
+    def recipes_list_auth(self):
+        return self.client.get('/api/recipes/?limit=6')
+
+    def recipe_detail(self):
+        return self.client.get(f'/api/recipes/{self.recipe_id}/')
+
+    def recipe_create(self):
+        return self.client.post(
+            '/api/recipes/', self.payload, content_type='application/json'
+        )
+
+    def recipe_update(self):
+        return self.client.patch(
+            f'/api/recipes/{self.own_recipe_id}/',
+            self.payload,
+            content_type='application/json'
+        )
+
+    def subscriptions(self):
+        return self.client.get('/api/users/subscriptions/?recipes_limit=3')
+
+    def cart_export(self):
+        return self.client.get('/api/recipes/download_shopping_cart/')
+
+    def ingredient_search(self):
+        return self.anonymous.get('/api/ingredients/?name=мол')
+
+    scenarios = (
+        'recipes_list',
+        'recipes_list_auth',
+        'recipe_detail',
+        'recipe_create',
+        'recipe_update',
+        'subscriptions',
+        'cart_export',
+        'ingredient_search',
+    )
+
+    def run(self, name, repeat):
+        scenario = getattr(self, name)
+        consume(scenario())
+        timings, queries = [], 0
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                start = perf_counter()
+                response = consume(scenario())
+                timings.append(perf_counter() - start)
+            if response.status_code >= 400:
+                raise AssertionError(
+                    f'{name}: ответ {response.status_code} '
+                    f'{response.content[:200]!r}'
+                )
+            queries = max(queries, len(captured))
+        return {
+            'time_ms': round(median(timings) * 1000, 2),
+            'queries': queries,
+        }
+
+
+def consume(response):
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
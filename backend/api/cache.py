@@ -0,0 +1,190 @@
+from functools import partial
+from threading import Lock
+from time import time_ns
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+from rest_framework.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED
+
+VERSION_KEY = 'version:{}'
+REFERENCE_KEY = 'reference:{name}:{version}:{path}'
+RECIPE_KEY = 'recipe:{pk}:{version}:{host}:{variant}'
+TAGS_VERSION = 'tags'
+INGREDIENTS_VERSION = 'ingredients'
+
+
+def get_version(name):
+    key = VERSION_KEY.format(name)
+    version = cache.get(key)
+    if version is None:
+        version = time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_version(*names):
+    version = time_ns()
+    cache.set_many(
+        {VERSION_KEY.format(name): version for name in names},
+        timeout=None
+    )
+    return version
+
+
+def recipe_version_name(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def bump_recipe_versions(recipe_ids):
+    names = [recipe_version_name(recipe_id) for recipe_id in set(recipe_ids)]
+    if names:
+        bump_version(*names)
+
+
+class RepresentationCache:
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+
+    @staticmethod
+    def version(recipe_id):
+        return get_version(recipe_version_name(recipe_id))
+
+    @staticmethod
+    def versions(recipe_ids):
+        """Версии нескольких рецептов одним обращением к кэшу.
+
+        Отсутствующие версии создаются так же, как в get_version.
+        """
+        keys = {
+            VERSION_KEY.format(recipe_version_name(recipe_id)): recipe_id
+            for recipe_id in recipe_ids
+        }
+        found = cache.get_many(keys)
+        versions = {keys[key]: version for key, version in found.items()}
+        missing = [key for key in keys if key not in found]
+        if missing:
+            now = time_ns()
+            for key in missing:
+                version = now
+                if not cache.add(key, version, timeout=None):
+                    version = cache.get(key, version)
+                versions[keys[key]] = version
+        return versions
+
+    def key(self, recipe_id, version, request=None, variant=''):
+        return RECIPE_KEY.format(
+            pk=recipe_id,
+            version=version,
+            host=request.get_host() if request is not None else '',
+            variant=variant
+        )
+
+    def get(self, key):
+        data = cache.get(key)
+        with self.lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def get_many(self, keys):
+        found = cache.get_many(keys)
+        with self.lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key, data, version, snapshot):
+        """Кэширует представление, если оно не старше версии в ключе.
+
+        snapshot — время до первого запроса к базе. Версия новее него
+        значит, что коммит с изменением мог закончиться уже после чтения
+        строки, и в кэш под новой версией попали бы старые данные.
+        Данные внутри транзакции тоже не кэшируются: её могут откатить.
+        """
+        if (
+            snapshot is not None
+            and version <= snapshot
+            and not connection.in_atomic_block
+        ):
+            cache.set(key, data, settings.RECIPE_CACHE_TIMEOUT)
+
+    def set_many(self, entries, snapshot):
+        """Как set, но для словаря ключ → (данные, версия) разом."""
+        if snapshot is None or connection.in_atomic_block:
+            return
+        cache.set_many(
+            {
+                key: data for key, (data, version) in entries.items()
+                if version <= snapshot
+            },
+            settings.RECIPE_CACHE_TIMEOUT
+        )
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+recipe_cache = RepresentationCache()
+
+
+class ReferenceCacheMixin:
+    cache_version_name = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, partial(super().list, request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, partial(super().retrieve, request, *args, **kwargs)
+        )
+
+    def cached_response(self, request, handler, store=True):
+        """Ответ из кэша или от handler с ETag по версии справочника.
+
+        304 отдаётся только для ответа, который существует: из кэша или
+        успешного вызова handler, иначе на несуществующий объект с тем же
+        If-None-Match пришёл бы 304 вместо 404.
+        """
+        version = get_version(self.cache_version_name)
+        etag = quote_etag(f'{self.cache_version_name}-{version}')
+        last_modified = version // 10 ** 9
+        key = REFERENCE_KEY.format(
+            name=self.cache_version_name,
+            version=version,
+            path=request.get_full_path()
+        )
+        data = cache.get(key) if store else None
+        if data is None:
+            response = handler()
+            if response.status_code != HTTP_200_OK:
+                return response
+            if store:
+                cache.set(
+                    key, response.data, settings.REFERENCE_CACHE_TIMEOUT
+                )
+        else:
+            response = Response(data)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified,
+            response=response
+        )
+        if response.status_code in (HTTP_200_OK, HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(
+                response, public=True, max_age=0, must_revalidate=True
+            )
+        return response
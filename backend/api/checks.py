@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+}
+
+
+@register(Tags.caches)
+def shared_cache_check(app_configs, **kwargs):
+    """Версии кэша должны быть общими для всех воркеров.
+
+    Иначе изменение, обработанное одним воркером, сбрасывает кэш только
+    у него, а остальные продолжают отдавать устаревшие данные.
+    """
+    if settings.WEB_CONCURRENCY <= 1:
+        return []
+    errors = []
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in PROCESS_LOCAL_CACHES:
+        errors.append(Error(
+            f'Кэш {backend} свой у каждого процесса, а воркеров '
+            f'{settings.WEB_CONCURRENCY}.',
+            hint='Укажите общий кэш в CACHE_BACKEND и CACHE_LOCATION, '
+                 'например memcached из infra/docker-compose*.yml.',
+            id='api.E001',
+        ))
+    if settings.AUTH_TOKEN_CACHE_ALIAS is None:
+        errors.append(Error(
+            'Без AUTH_TOKEN_CACHE_ALIAS токены кэшируются в каждом '
+            'процессе, и отозванный токен работает на других воркерах.',
+            hint='Укажите алиас общего кэша, например default.',
+            id='api.E002',
+        ))
+    return errors
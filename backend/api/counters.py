@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import Favourite, Recipe
+from users.models import Subscribe
+
+User = get_user_model()
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favourite, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscribe, 'author'),
+)
+
+
+def change_counter(queryset, counter, delta):
+    """Сдвигает счётчик у строк queryset одним UPDATE без гонок."""
+    if delta:
+        queryset.update(**{counter: Greatest(F(counter) + delta, 0)})
+
+
+def live_count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def recalculate_counters(recipes=None, users=None):
+    """Пересчитывает счётчики по связанным строкам.
+
+    Без аргументов пересчитываются все рецепты и пользователи.
+    """
+    querysets = {
+        Recipe: Recipe.objects.all() if recipes is None else recipes,
+        User: User.objects.all() if users is None else users,
+    }
+    for model, counter, related_model, field in COUNTERS:
+        querysets[model].update(**{counter: live_count(related_model, field)})
+
+
+def counter_drift():
+    """Строки, у которых счётчик разошёлся с числом связанных строк."""
+    for model, counter, related_model, field in COUNTERS:
+        rows = model.objects.annotate(
+            live=live_count(related_model, field)
+        ).exclude(**{counter: F('live')}).order_by('pk').values_list(
+            'pk', counter, 'live'
+        )
+        for pk, stored, live in rows:
+            yield model, counter, pk, stored, live
@@ -0,0 +1,193 @@
+import binascii
+import uuid
+from base64 import b64decode
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, UnidentifiedImageError
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import Field, ImageField, IntegerField, ListField
+from rest_framework.serializers import ListSerializer
+
+MAX_HEADER_LENGTH = 100
+BASE64_WHITESPACE = str.maketrans('', '', ' \t\n\r\f\v')
+IMAGE_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+
+
+class StreamingBase64ImageField(ImageField):
+    """Изображение в base64, декодируемое по частям во временный файл.
+
+    Декодированные данные не собираются в одну строку байтов: до
+    ``IMAGE_SPOOL_MAX_SIZE`` они лежат в памяти, дальше — на диске.
+    Pillow читает только заголовок, чтобы проверить формат и размеры.
+    Пробелы и переводы строк, как в base64 с разбивкой по MIME,
+    пропускаются.
+    """
+    default_error_messages = {
+        'invalid_base64': 'Загрузите корректное изображение в base64.',
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+        'invalid_format': 'Допустимые форматы: {formats}.',
+        'too_many_pixels': 'Изображение не должно превышать '
+                           '{max_pixels} пикселей.',
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid_base64')
+        header = data.find(';base64,', 0, MAX_HEADER_LENGTH)
+        offset = header + len(';base64,') if header != -1 else 0
+        spool = SpooledTemporaryFile(max_size=settings.IMAGE_SPOOL_MAX_SIZE)
+        try:
+            extension = self.validate_image(self.decode(data, offset, spool))
+        except ValidationError:
+            spool.close()
+            raise
+        size = spool.seek(0, 2)
+        spool.seek(0)
+        return UploadedFile(
+            spool, name=f'{uuid.uuid4()}.{extension}', size=size
+        )
+
+    def decode(self, data, offset, spool):
+        """Декодирует data[offset:] в spool частями, кратными 4 символам.
+
+        Пробельные символы убираются из каждой части, а остаток после
+        выравнивания переносится в следующую. Размер проверяется по ходу
+        декодирования, поэтому слишком большое изображение не дочитывается.
+        """
+        chunk_size = settings.IMAGE_DECODE_CHUNK // 4 * 4
+        pending = ''
+        try:
+            for start in range(offset, len(data), chunk_size):
+                pending += data[start:start + chunk_size].translate(
+                    BASE64_WHITESPACE
+                )
+                aligned = len(pending) // 4 * 4
+                spool.write(b64decode(pending[:aligned], validate=True))
+                pending = pending[aligned:]
+                if spool.tell() > settings.IMAGE_MAX_UPLOAD_SIZE:
+                    self.fail(
+                        'too_large', max_size=settings.IMAGE_MAX_UPLOAD_SIZE
+                    )
+            if pending:
+                self.fail('invalid_base64')
+        except (binascii.Error, ValueError):
+            self.fail('invalid_base64')
+        if not spool.tell():
+            self.fail('invalid_base64')
+        return spool
+
+    def validate_image(self, spool):
+        spool.seek(0)
+        try:
+            with Image.open(spool) as image:
+                image_format = image.format
+                width, height = image.size
+                if image_format in IMAGE_FORMATS:
+                    image.verify()
+        except (UnidentifiedImageError, OSError, SyntaxError):
+            self.fail('invalid_base64')
+        except Image.DecompressionBombError:
+            self.fail('too_many_pixels', max_pixels=settings.IMAGE_MAX_PIXELS)
+        if image_format not in IMAGE_FORMATS:
+            self.fail('invalid_format', formats=', '.join(IMAGE_FORMATS))
+        if width * height > settings.IMAGE_MAX_PIXELS:
+            self.fail('too_many_pixels', max_pixels=settings.IMAGE_MAX_PIXELS)
+        return IMAGE_FORMATS[image_format]
+
+
+class RenditionImageField(Field):
+    """Ссылка на уменьшенную копию изображения рецепта.
+
+    Пока копия не готова, отдаётся ссылка на оригинал.
+    """
+
+    def __init__(self, rendition, **kwargs):
+        self.rendition = rendition
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        name = recipe.renditions.get(self.rendition)
+        url = default_storage.url(name) if name else recipe.image.url
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+def resolve_ids(queryset, ids, message):
+    """Достаёт объекты по списку id одним запросом.
+
+    Если каких-то id нет, ошибка перечисляет их все сразу.
+    """
+    objects = queryset.order_by().in_bulk(set(ids))
+    missing = sorted(set(ids) - objects.keys())
+    if missing:
+        raise ValidationError(
+            message.format(ids=', '.join(map(str, missing)))
+        )
+    return objects
+
+
+class PrimaryKeyListField(ListField):
+    """Список id, который превращается в объекты одним запросом ``in_bulk``.
+
+    Порядок и повторы сохраняются, чтобы их можно было проверить дальше.
+    """
+    default_error_messages = {
+        'does_not_exist': 'Объекты с id {ids} не существуют.',
+    }
+
+    def __init__(self, queryset, **kwargs):
+        self.queryset = queryset
+        kwargs.setdefault('child', IntegerField(min_value=1))
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        ids = super().to_internal_value(data)
+        objects = resolve_ids(
+            self.queryset.all(), ids, self.error_messages['does_not_exist']
+        )
+        return [objects[pk] for pk in ids]
+
+    def to_representation(self, value):
+        if hasattr(value, 'all'):
+            value = value.all()
+        return [item.pk for item in value]
+
+
+class BulkRelatedListSerializer(ListSerializer):
+    """Список вложенных объектов со ссылками, проверяемыми одним запросом.
+
+    Дочерний сериализатор объявляет ``related_querysets``: имя поля с id
+    и queryset, в котором эти id ищутся. После проверки id в данных
+    заменяются объектами.
+    """
+    default_error_messages = {
+        'does_not_exist': 'Объекты с id {ids} не существуют.',
+    }
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        for field_name, queryset in self.child.related_querysets.items():
+            objects = resolve_ids(
+                queryset.all(),
+                [item[field_name] for item in items],
+                self.child.error_messages.get(
+                    'does_not_exist', self.error_messages['does_not_exist']
+                )
+            )
+            for item in items:
+                item[field_name] = objects[item[field_name]]
+        return items
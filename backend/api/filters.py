@@ -1,6 +1,6 @@
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import (BooleanFilter, CharFilter,
-                                           FilterSet,
+                                           ChoiceFilter, FilterSet,
                                            ModelMultipleChoiceFilter)
 
 from recipes.models import Ingredient, Recipe, Tag
@@ -28,6 +28,16 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = CharFilter(
+        method='filter_search'
+    )
+    ordering = ChoiceFilter(
+        choices=(
+            ('popular', 'Сначала популярные'),
+            ('new', 'Сначала новые'),
+        ),
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Recipe
@@ -47,3 +57,13 @@ class RecipeFilter(FilterSet):
         if value and not user.is_anonymous:
             return queryset.filter(shopping_cart__user=user)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        if value.strip():
+            return queryset.search(value)
+        return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        if value == 'popular':
+            return queryset.order_by('-favorites_count', '-id')
+        return queryset.order_by('-id')
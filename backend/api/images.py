@@ -0,0 +1,121 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+from .cache import bump_recipe_versions
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            thread_name_prefix='renditions'
+        )
+    return _executor
+
+
+def render(image, width, height, crop):
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.LANCZOS)
+    image = image.copy()
+    image.thumbnail((width, height), Image.LANCZOS)
+    return image
+
+
+def make_renditions(name, storage=default_storage):
+    """Сохраняет уменьшенные копии изображения и возвращает их пути."""
+    largest = max(
+        max(width, height)
+        for width, height, _ in settings.IMAGE_RENDITIONS.values()
+    )
+    with storage.open(name) as file, Image.open(file) as image:
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert(
+            'RGBA' if 'A' in image.getbands() else 'RGB'
+        )
+        stem = PurePosixPath(name).stem
+        renditions = {}
+        for rendition, (width, height, crop) in (
+            settings.IMAGE_RENDITIONS.items()
+        ):
+            buffer = BytesIO()
+            render(image, width, height, crop).save(
+                buffer,
+                settings.IMAGE_RENDITION_FORMAT,
+                quality=settings.IMAGE_RENDITION_QUALITY,
+                method=settings.IMAGE_RENDITION_METHOD
+            )
+            extension = settings.IMAGE_RENDITION_FORMAT.lower()
+            renditions[rendition] = storage.save(
+                f'{settings.IMAGE_RENDITIONS_DIR}/{stem}_{rendition}'
+                f'.{extension}',
+                ContentFile(buffer.getvalue())
+            )
+    return renditions
+
+
+def delete_renditions(renditions, storage=default_storage):
+    for name in renditions.values():
+        storage.delete(name)
+
+
+def generate_renditions(recipe_id):
+    recipe = Recipe.objects.only('image', 'renditions').get(pk=recipe_id)
+    renditions = make_renditions(recipe.image.name)
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(renditions=renditions)
+    if updated:
+        delete_renditions(recipe.renditions)
+        bump_recipe_versions([recipe_id])
+    else:
+        delete_renditions(renditions)
+    return renditions
+
+
+def _generate_in_background(recipe_id):
+    try:
+        generate_renditions(recipe_id)
+    except Recipe.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception(
+            'Не удалось подготовить изображения рецепта %s', recipe_id
+        )
+    finally:
+        connections.close_all()
+
+
+def reset_renditions(recipe):
+    """Сбрасывает копии старого изображения перед заменой оригинала."""
+    renditions, recipe.renditions = recipe.renditions, {}
+    Recipe.objects.filter(pk=recipe.pk).update(renditions={})
+    if renditions:
+        transaction.on_commit(lambda: delete_renditions(renditions))
+
+
+def schedule_renditions(recipe_id):
+    """Ставит нарезку изображений в очередь после фиксации транзакции.
+
+    При ``IMAGE_WORKERS = 0`` изображения готовятся в том же потоке.
+    """
+    if settings.IMAGE_WORKERS:
+        transaction.on_commit(
+            lambda: get_executor().submit(_generate_in_background, recipe_id)
+        )
+    else:
+        transaction.on_commit(lambda: generate_renditions(recipe_id))
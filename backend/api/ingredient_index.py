@@ -0,0 +1,131 @@
+import re
+from bisect import bisect_left
+from collections import Counter
+from threading import Lock
+
+from django.conf import settings
+
+from recipes.models import Ingredient
+from .cache import INGREDIENTS_VERSION, get_version
+
+WORD_BOUNDARY = re.compile(r'[\s\-,.()«»"]+')
+
+_index = None
+_lock = Lock()
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е').strip()
+
+
+def trigrams(value):
+    padded = f'  {value} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Префиксный поиск идёт бинарным поиском по отсортированным названиям
+    и по окончаниям названий, начинающимся с каждого следующего слова.
+    Нечёткий поиск считает сходство по триграммам.
+    """
+
+    def __init__(self, ingredients, version=None):
+        self.version = version
+        self.items = []
+        self.names = []
+        self.trigram_counts = []
+        names, words = [], []
+        self.trigrams = {}
+        for position, (pk, name, measurement_unit) in enumerate(ingredients):
+            key = normalize(name)
+            self.items.append({
+                'id': pk,
+                'name': name,
+                'measurement_unit': measurement_unit,
+            })
+            self.names.append(key)
+            names.append((key, position))
+            for match in WORD_BOUNDARY.finditer(key):
+                if match.end() < len(key):
+                    words.append((key[match.end():], position))
+            key_trigrams = trigrams(key)
+            self.trigram_counts.append(len(key_trigrams))
+            for trigram in key_trigrams:
+                self.trigrams.setdefault(trigram, []).append(position)
+        names.sort()
+        words.sort()
+        self.name_keys = [key for key, _ in names]
+        self.name_positions = [position for _, position in names]
+        self.word_keys = [key for key, _ in words]
+        self.word_positions = [position for _, position in words]
+
+    @staticmethod
+    def _prefix(keys, positions, query):
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query + '\uffff', lo=start)
+        return positions[start:end]
+
+    def _rank(self, positions, query):
+        return sorted(
+            set(positions),
+            key=lambda position: (
+                self.names[position] != query,
+                len(self.names[position]),
+                self.names[position],
+            )
+        )
+
+    def _similar(self, query, exclude, limit):
+        query_trigrams = trigrams(query)
+        common = Counter()
+        for trigram in query_trigrams:
+            common.update(self.trigrams.get(trigram, ()))
+        scored = []
+        for position, shared in common.items():
+            if position in exclude:
+                continue
+            total = (len(query_trigrams)
+                     + self.trigram_counts[position] - shared)
+            similarity = shared / total
+            if similarity >= settings.INGREDIENT_SEARCH_SIMILARITY:
+                scored.append((-similarity, self.names[position], position))
+        scored.sort()
+        return [position for _, _, position in scored[:limit]]
+
+    def search(self, query, limit, fuzzy=False):
+        query = normalize(query)
+        if not query:
+            return []
+        found = self._rank(
+            self._prefix(self.name_keys, self.name_positions, query), query
+        )[:limit]
+        if len(found) < limit:
+            seen = set(found)
+            found += [
+                position for position in self._rank(
+                    self._prefix(self.word_keys, self.word_positions, query),
+                    query
+                ) if position not in seen
+            ][:limit - len(found)]
+        if fuzzy and len(found) < limit:
+            found += self._similar(query, set(found), limit - len(found))
+        return [self.items[position] for position in found]
+
+
+def get_index():
+    global _index
+    version = get_version(INGREDIENTS_VERSION)
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = IngredientIndex(
+                    Ingredient.objects.order_by('id').values_list(
+                        'id', 'name', 'measurement_unit'
+                    ),
+                    version
+                )
+            index = _index
+    return index
@@ -0,0 +1,267 @@
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from queue import Empty, Queue
+from statistics import mean
+from threading import Thread
+from time import perf_counter, sleep
+from http.client import HTTPException
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, Tag
+
+from .benchmark import make_client, percentile
+from .synthetic import WORDS
+
+User = get_user_model()
+
+PAGE_SIZE = 6
+MAX_PAGE = 100
+URL_SAFE = "/?&=%:+,;"
+NETWORK_ERROR = 0
+QUERY_COUNT = re.compile(r'db;[^,]*desc="(\d+) queries"')
+SERVERS = {
+    'wsgi': ('foodgram.wsgi', ()),
+    'asgi': (
+        'foodgram.asgi:application',
+        ('--worker-class', 'uvicorn.workers.UvicornWorker')
+    ),
+}
+SETUPS = {
+    'wsgi': ('wsgi', {}),
+    'asgi': ('asgi', {}),
+    'no-reuse': ('wsgi', {'DB_CONN_MAX_AGE': '0'}),
+    'persistent': (
+        'wsgi', {'DB_CONN_MAX_AGE': '60', 'DB_CONN_HEALTH_CHECKS': 'True'}
+    ),
+}
+READY_PATH = '/api/tags/'
+
+
+def read_traffic(path):
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+class Placeholders:
+    """Случайные значения для подстановки в пути из файла трафика."""
+
+    def __init__(self, rng, prefix):
+        self.rng = rng
+        self.recipes = list(Recipe.objects.values_list('pk', flat=True))
+        self.users = list(User.objects.values_list('pk', flat=True))
+        self.tags = list(Tag.objects.values_list('slug', flat=True))
+        self.ingredients = list(
+            Ingredient.objects.values_list('name', flat=True)
+        )
+        tokens = Token.objects.filter(user__username__startswith=prefix)
+        if not tokens.exists():
+            tokens = Token.objects.all()
+        self.tokens = list(tokens.values_list('key', flat=True))
+        self.pages = max(1, min(len(self.recipes) // PAGE_SIZE, MAX_PAGE))
+
+    def values(self):
+        return {
+            'recipe': self.rng.choice(self.recipes or [0]),
+            'user': self.rng.choice(self.users or [0]),
+            'tag': self.rng.choice(self.tags or ['']),
+            'ingredient': self.rng.choice(self.ingredients or [''])[:3],
+            'word': self.rng.choice(WORDS),
+            'page': self.rng.randint(1, self.pages),
+        }
+
+    def token(self):
+        return self.rng.choice(self.tokens) if self.tokens else None
+
+
+def plan(traffic, count, seed, prefix):
+    """Раскладывает трафик в список из count конкретных запросов."""
+    rng = random.Random(seed)
+    placeholders = Placeholders(rng, prefix)
+    entries = rng.choices(
+        traffic, [entry.get('weight', 1) for entry in traffic], k=count
+    )
+    return [{
+        'name': entry.get('name', entry['path']),
+        'method': entry.get('method', 'GET').upper(),
+        'path': entry['path'].format(**placeholders.values()),
+        'body': entry.get('body'),
+        'token': placeholders.token() if entry.get('auth') else None,
+    } for entry in entries]
+
+
+def call_in_process(request):
+    client = make_client(request['token'])
+    client.raise_request_exception = False
+    with CaptureQueriesContext(connection) as queries:
+        start = perf_counter()
+        response = client.generic(
+            request['method'],
+            request['path'],
+            json.dumps(request['body']) if request['body'] else '',
+            content_type='application/json'
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        elapsed = perf_counter() - start
+    return response.status_code, elapsed, len(queries)
+
+
+def call_http(base_url, request):
+    headers = {'Content-Type': 'application/json'}
+    if request['token']:
+        headers['Authorization'] = f'Token {request["token"]}'
+    data = json.dumps(request['body']).encode() if request['body'] else None
+    start = perf_counter()
+    try:
+        with urlopen(Request(
+            base_url.rstrip('/') + quote(request['path'], safe=URL_SAFE),
+            data=data,
+            headers=headers,
+            method=request['method']
+        )) as response:
+            response.read()
+            status = response.status
+            server_timing = response.headers.get('Server-Timing', '')
+    except HTTPError as error:
+        error.read()
+        status = error.code
+        server_timing = error.headers.get('Server-Timing', '')
+    except (OSError, HTTPException):
+        return NETWORK_ERROR, perf_counter() - start, None
+    elapsed = perf_counter() - start
+    match = QUERY_COUNT.search(server_timing)
+    return status, elapsed, int(match.group(1)) if match else None
+
+
+def run(requests, concurrency=1, base_url=None):
+    """Выполняет запросы и возвращает общее время и результаты по каждому.
+
+    Без base_url запросы идут через тестовый клиент Django в том же
+    процессе, и для каждого считается число SQL-запросов. С base_url
+    число запросов берётся из Server-Timing у ответов, попавших в выборку
+    метрик.
+    """
+    pending = Queue()
+    for request in requests:
+        pending.put(request)
+    results = []
+
+    def worker():
+        try:
+            while True:
+                try:
+                    request = pending.get_nowait()
+                except Empty:
+                    return
+                if base_url:
+                    result = call_http(base_url, request)
+                else:
+                    result = call_in_process(request)
+                results.append((request['name'], *result))
+        finally:
+            connection.close()
+
+    start = perf_counter()
+    threads = [Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return perf_counter() - start, results
+
+
+def summarize(results):
+    grouped = defaultdict(list)
+    for name, status, elapsed, queries in results:
+        grouped[name].append((status, elapsed, queries))
+    summary = {}
+    for name, rows in sorted(grouped.items()):
+        timings = [elapsed for _, elapsed, _ in rows]
+        queries = [count for _, _, count in rows if count is not None]
+        summary[name] = {
+            'count': len(rows),
+            'client_errors': sum(400 <= status < 500 for status, _, _ in rows),
+            'failures': sum(
+                status >= 500 or status == NETWORK_ERROR
+                for status, _, _ in rows
+            ),
+            'p50': percentile(timings, 50),
+            'p95': percentile(timings, 95),
+            'p99': percentile(timings, 99),
+            'queries': mean(queries) if queries else None,
+            'max_queries': max(queries) if queries else None,
+        }
+    return summary
+
+
+def pooled_setup(address):
+    """Настройка WSGI, при которой бэкенд ходит в базу через PgBouncer."""
+    host, _, port = address.rpartition(':')
+    return 'wsgi', {
+        'DB_HOST': host,
+        'DB_PORT': port,
+        'DB_CONN_MAX_AGE': '60',
+        'DB_DISABLE_SERVER_SIDE_CURSORS': 'True',
+    }
+
+
+@contextmanager
+def running_server(kind, workers, port, env=None, timeout=30):
+    """Запускает gunicorn с WSGI- или ASGI-приложением и отдаёт его адрес.
+
+    Под ASGI включаются асинхронные view для чтения. Выборка метрик
+    отключена, чтобы не мешать замеру. Переменные из env дополняют
+    окружение сервера.
+    """
+    app, options = SERVERS[kind]
+    process = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn', app,
+            '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers),
+            '--log-level', 'warning',
+            *options,
+        ],
+        cwd=settings.BASE_DIR,
+        env={
+            **os.environ,
+            'ASYNC_READ_VIEWS': str(kind == 'asgi'),
+            'METRICS_SAMPLE_RATE': '0',
+            **(env or {}),
+        }
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = perf_counter() + timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(
+                    f'{kind}: сервер завершился с кодом {process.returncode}'
+                )
+            try:
+                with urlopen(base_url + READY_PATH, timeout=1):
+                    break
+            except OSError:
+                if perf_counter() > deadline:
+                    raise RuntimeError(
+                        f'{kind}: сервер не ответил за {timeout} с'
+                    )
+                sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=timeout)
@@ -0,0 +1,104 @@
+import resource
+import tracemalloc
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+
+from api.benchmark import measure
+from api.fields import StreamingBase64ImageField
+from api.images import make_renditions
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет пиковую память при декодировании загрузки и пропускную '
+        'способность пула, готовящего уменьшенные копии изображений.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=4000)
+        parser.add_argument('--height', type=int, default=3000)
+        parser.add_argument('--count', type=int, default=16)
+        parser.add_argument(
+            '--workers', type=int, nargs='+', default=[1, 2, 4]
+        )
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        image = self.make_image(options['width'], options['height'])
+        payload = 'data:image/jpeg;base64,' + b64encode(image).decode()
+        self.stdout.write(
+            f'Изображение {options["width"]}x{options["height"]}, '
+            f'{len(image) / 2 ** 20:.1f} МиБ, base64 '
+            f'{len(payload) / 2 ** 20:.1f} МиБ'
+        )
+        self.stdout.write(f'{"декодер":>24} {"мс":>10} {"пик, МиБ":>10}')
+        for name, field in (
+            ('Base64ImageField', Base64ImageField()),
+            ('StreamingBase64ImageField', StreamingBase64ImageField()),
+        ):
+            timing = median(measure(
+                lambda: field.to_internal_value(payload), options['repeat']
+            ))
+            self.stdout.write(
+                f'{name:>24} {timing * 1000:>10.1f} '
+                f'{self.peak(field.to_internal_value, payload):>10.1f}'
+            )
+
+        with TemporaryDirectory() as directory:
+            storage = FileSystemStorage(location=directory)
+            name = storage.save('original.jpg', ContentFile(image))
+            rss_before = self.max_rss()
+            make_renditions(name, storage)
+            self.stdout.write(
+                f'Прирост пикового RSS на одну нарезку: '
+                f'{self.max_rss() - rss_before:.1f} МиБ'
+            )
+            self.stdout.write(
+                f'{"потоков":>8} {"изобр./с":>10} {"мс на изобр.":>14} '
+                f'{"+RSS, МиБ":>10}'
+            )
+            for workers in options['workers']:
+                rss_before = self.max_rss()
+                start = perf_counter()
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(
+                        lambda _: make_renditions(name, storage),
+                        range(options['count'])
+                    ))
+                elapsed = perf_counter() - start
+                self.stdout.write(
+                    f'{workers:>8} {options["count"] / elapsed:>10.2f} '
+                    f'{elapsed / options["count"] * 1000:>14.1f} '
+                    f'{self.max_rss() - rss_before:>10.1f}'
+                )
+
+    @staticmethod
+    def make_image(width, height):
+        buffer = BytesIO()
+        Image.effect_noise((width, height), 64).convert('RGB').save(
+            buffer, 'JPEG', quality=90
+        )
+        return buffer.getvalue()
+
+    @staticmethod
+    def peak(func, *args):
+        tracemalloc.start()
+        try:
+            func(*args)
+            return tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+
+    @staticmethod
+    def max_rss():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -0,0 +1,59 @@
+from io import BytesIO
+from statistics import median
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmark import make_client, measure
+from api.renderers import FastJSONParser, FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает рендеринг и разбор страницы рецептов стандартными '
+        'JSON-классами DRF и классами из api.renderers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=24)
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument(
+            '--token', help='Токен пользователя, чтобы заполнить флаги.'
+        )
+
+    def handle(self, *args, **options):
+        response = make_client(options['token']).get(
+            '/api/recipes/', {'limit': options['limit']}
+        )
+        if response.status_code != 200 or not response.data['results']:
+            raise CommandError('Нет рецептов: заполните базу generate_data.')
+        data = response.data
+        standard = JSONRenderer().render(data)
+        fast = FastJSONRenderer().render(data)
+        if standard != fast:
+            raise CommandError('Рендереры выдают разный JSON.')
+        self.stdout.write(
+            f'{len(data["results"])} рецептов, {len(standard)} байт, '
+            f'библиотека: {"orjson" if orjson else "json (orjson нет)"}'
+        )
+        self.stdout.write(
+            f'{"":<10} {"DRF, мс":>10} {"api, мс":>10} {"ускорение":>10}'
+        )
+        self.report('рендеринг', options['repeat'], *(
+            lambda renderer=renderer: renderer.render(data)
+            for renderer in (JSONRenderer(), FastJSONRenderer())
+        ))
+        self.report('разбор', options['repeat'], *(
+            lambda parser=parser: parser.parse(BytesIO(standard))
+            for parser in (JSONParser(), FastJSONParser())
+        ))
+
+    def report(self, name, repeat, standard, fast):
+        standard_time = median(measure(standard, repeat))
+        fast_time = median(measure(fast, repeat))
+        self.stdout.write(
+            f'{name:<10} {standard_time * 1000:>10.3f} '
+            f'{fast_time * 1000:>10.3f} '
+            f'{standard_time / fast_time:>9.1f}x'
+        )
@@ -0,0 +1,58 @@
+from statistics import median
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand
+
+from api.benchmark import make_client, measure
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время ответа постраничной и курсорной пагинации '
+        'на разной глубине списка.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/recipes/')
+        parser.add_argument('--limit', type=int, default=24)
+        parser.add_argument(
+            '--depths', type=int, nargs='+', default=[1, 10, 100, 1000]
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--token', help='Токен пользователя для закрытых эндпоинтов.'
+        )
+
+    def handle(self, *args, **options):
+        client = make_client(options['token'])
+        path, limit = options['path'], options['limit']
+        depths = sorted(set(options['depths']))
+        cursor_urls = self.walk_cursor(client, path, limit, depths[-1])
+        self.stdout.write(
+            f'{"страница":>10} {"page, мс":>12} {"cursor, мс":>12}'
+        )
+        for depth in depths:
+            page_url = f'{path}?{urlencode({"limit": limit, "page": depth})}'
+            if client.get(page_url).status_code != 200:
+                self.stdout.write(f'{depth:>10} — в списке меньше страниц')
+                break
+            page_time = median(measure(
+                lambda: client.get(page_url), options['repeat']
+            ))
+            cursor_url = cursor_urls[depth - 1]
+            cursor_time = median(measure(
+                lambda: client.get(cursor_url), options['repeat']
+            ))
+            self.stdout.write(
+                f'{depth:>10} {page_time * 1000:>12.2f} '
+                f'{cursor_time * 1000:>12.2f}'
+            )
+
+    @staticmethod
+    def walk_cursor(client, path, limit, depth):
+        url = f'{path}?{urlencode({"limit": limit, "pagination": "cursor"})}'
+        urls = []
+        while url and len(urls) < depth:
+            urls.append(url)
+            url = client.get(url).json().get('next')
+        return urls
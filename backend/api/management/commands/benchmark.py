@@ -0,0 +1,101 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark import BASELINES, Suite, load_baselines, scratch_database
+
+METRICS = {'time': 'time_ms', 'queries': 'queries'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет эталонные сценарии API на тестовой базе с фиксированным '
+        'набором данных и сравнивает время и число SQL-запросов с '
+        'сохранёнными в репозитории значениями.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument(
+            '--time-margin', type=float, default=0.5,
+            help='Допустимое превышение времени, доля от эталона.'
+        )
+        parser.add_argument(
+            '--query-margin', type=float, default=0,
+            help='Допустимое превышение числа запросов, доля от эталона.'
+        )
+        parser.add_argument(
+            '--metrics', nargs='+', choices=METRICS, default=list(METRICS),
+            help='Что сравнивать. Время зависит от машины, поэтому в CI '
+                 'достаточно queries.'
+        )
+        parser.add_argument(
+            '--scenarios', nargs='+', choices=Suite.scenarios,
+            default=Suite.scenarios
+        )
+        parser.add_argument(
+            '--update-baselines', action='store_true',
+            help='Записать результаты как новые эталоны.'
+        )
+
+    def handle(self, *args, **options):
+        results = self.measure(options['scenarios'], options['repeat'])
+        if options['update_baselines']:
+            baselines = load_baselines()
+            baselines.update(results)
+            BASELINES.write_text(
+                json.dumps(baselines, indent=2, sort_keys=True) + '\n',
+                encoding='utf-8'
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f'Эталоны записаны: {BASELINES}')
+            )
+            return
+        margins = {
+            'time_ms': options['time_margin'],
+            'queries': options['query_margin'],
+        }
+        failures = self.compare(
+            results,
+            load_baselines(),
+            {METRICS[metric]: margins[METRICS[metric]]
+             for metric in options['metrics']}
+        )
+        if failures:
+            raise CommandError(
+                'Превышены эталоны:\n' + '\n'.join(failures)
+            )
+        self.stdout.write(
+            self.style.SUCCESS('Все сценарии в пределах эталонов.')
+        )
+
+    def measure(self, scenarios, repeat):
+        with scratch_database():
+            suite = Suite()
+            results = {}
+            self.stdout.write(f'{"сценарий":<20} {"мс":>10} {"SQL":>5}')
+            for name in scenarios:
+                results[name] = suite.run(name, repeat)
+                self.stdout.write(
+                    f'{name:<20} {results[name]["time_ms"]:>10.2f} '
+                    f'{results[name]["queries"]:>5}'
+                )
+            return results
+
+    def compare(self, results, baselines, margins):
+        failures = []
+        for name, result in results.items():
+            baseline = baselines.get(name)
+            if baseline is None:
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: эталона нет, запустите --update-baselines'
+                ))
+                continue
+            for metric, margin in margins.items():
+                limit = baseline[metric] * (1 + margin)
+                if result[metric] > limit:
+                    failures.append(
+                        f'{name}: {metric} {result[metric]} > '
+                        f'{baseline[metric]} (+{margin:.0%})'
+                    )
+        return failures
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark import scratch_database
+from api.query_plans import HotQueries
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет тестовую базу и через EXPLAIN проверяет, что горячие '
+        'запросы API читают таблицы по индексам, а не целиком.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument(
+            '--show-plans', action='store_true',
+            help='Вывести планы всех запросов, а не только проваленных.'
+        )
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            results = HotQueries(
+                options['users'], options['recipes']
+            ).check()
+        failures = []
+        for name, (plan, seq_scans) in results.items():
+            if seq_scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: полный просмотр {", ".join(seq_scans)}'
+                ))
+            else:
+                self.stdout.write(f'{name}: индексы')
+            if seq_scans or options['show_plans']:
+                self.stdout.write(plan + '\n')
+        if failures:
+            raise CommandError(
+                'Запросы без индексов: ' + ', '.join(failures)
+            )
+        self.stdout.write(
+            self.style.SUCCESS('Все горячие запросы используют индексы.')
+        )
@@ -0,0 +1,94 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.permissions import SAFE_METHODS
+
+from api.benchmark import percentile
+from api.loadtest import (SETUPS, plan, pooled_setup, read_traffic, run,
+                          running_server, summarize)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность gunicorn в разных настройках '
+        'при одинаковом числе воркеров: WSGI и ASGI с асинхронными view, '
+        'соединения с базой на каждый запрос, постоянные или через '
+        'PgBouncer. Запросы на чтение берутся из файла трафика, данные — '
+        'из текущей базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=settings.BASE_DIR.parent / 'data' / 'traffic.jsonl',
+            type=Path
+        )
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--port', type=int, default=8100)
+        parser.add_argument('--warmup', type=int, default=100)
+        parser.add_argument(
+            '--prefix', default='load',
+            help='Префикс имён пользователей, от которых идут запросы.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--setups', nargs='+', choices=SETUPS, default=['wsgi', 'asgi'],
+            help=(
+                'Настройки для сравнения: wsgi и asgi берут соединения '
+                'с базой из окружения, no-reuse открывает соединение '
+                'на каждый запрос, persistent держит его между запросами.'
+            )
+        )
+        parser.add_argument(
+            '--pgbouncer', metavar='HOST:PORT',
+            help='Добавить к сравнению WSGI через PgBouncer по этому адресу.'
+        )
+
+    def handle(self, *args, **options):
+        traffic = [
+            entry for entry in read_traffic(options['path'])
+            if entry.get('method', 'GET').upper() in SAFE_METHODS
+        ]
+        if not traffic:
+            raise CommandError('В файле трафика нет запросов на чтение.')
+        requests = plan(
+            traffic, options['requests'], options['seed'], options['prefix']
+        )
+        concurrency = max(1, options['concurrency'])
+        setups = {name: SETUPS[name] for name in options['setups']}
+        if options['pgbouncer']:
+            setups['pgbouncer'] = pooled_setup(options['pgbouncer'])
+        summaries = {}
+        for port, (name, (kind, env)) in enumerate(
+            setups.items(), options['port']
+        ):
+            try:
+                with running_server(
+                    kind, options['workers'], port, env
+                ) as base_url:
+                    run(requests[:options['warmup']], concurrency, base_url)
+                    elapsed, results = run(requests, concurrency, base_url)
+            except RuntimeError as error:
+                raise CommandError(str(error))
+            timings = [elapsed for _, _, elapsed, _ in results]
+            summaries[name] = summarize(results)
+            self.stdout.write(
+                f'{name}: {len(results) / elapsed:.1f} запросов/с, '
+                f'p50 {percentile(timings, 50) * 1000:.1f} мс, '
+                f'p95 {percentile(timings, 95) * 1000:.1f} мс, '
+                f'p99 {percentile(timings, 99) * 1000:.1f} мс, сбоев '
+                f'{sum(row["failures"] for row in summaries[name].values())}'
+            )
+        self.stdout.write(
+            f'{"эндпоинт":<20} '
+            + ' '.join(f'{f"{name} p95, мс":>18}' for name in summaries)
+        )
+        for endpoint in next(iter(summaries.values())):
+            self.stdout.write(f'{endpoint:<20} ' + ' '.join(
+                f'{summary[endpoint]["p95"] * 1000:>18.1f}'
+                for summary in summaries.values()
+            ))
@@ -0,0 +1,66 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Ingredient, Tag
+from api.synthetic import PASSWORD, Generator
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетических пользователей, рецепты, избранное, корзины '
+        'и подписки для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument(
+            '--ingredients', type=int, nargs=2, default=(3, 12),
+            metavar=('MIN', 'MAX'), help='Ингредиентов в рецепте.'
+        )
+        parser.add_argument(
+            '--tags', type=int, nargs=2, default=(1, 3),
+            metavar=('MIN', 'MAX'), help='Тегов у рецепта.'
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=10,
+            help='Среднее число рецептов в избранном у пользователя.'
+        )
+        parser.add_argument(
+            '--cart', type=int, default=5,
+            help='Среднее число рецептов в корзине у пользователя.'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=5,
+            help='Среднее число подписок у пользователя.'
+        )
+        parser.add_argument('--prefix', default='load')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not Ingredient.objects.exists() or not Tag.objects.exists():
+            raise CommandError(
+                'Сначала загрузите ингредиенты и теги: '
+                'manage.py load_ingredients ingredients.json --tags tag.json'
+            )
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        start = perf_counter()
+        user_ids, recipe_ids = Generator(
+            options['prefix'], options['seed'], options['batch_size']
+        ).run(
+            options['users'],
+            options['recipes'],
+            ingredients=options['ingredients'],
+            tags=options['tags'],
+            favorites=options['favorites'],
+            cart=options['cart'],
+            subscriptions=options['subscriptions'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(user_ids)}, рецептов: '
+            f'{len(recipe_ids)} за {perf_counter() - start:.1f} с. '
+            f'Пароль пользователей: {PASSWORD}'
+        ))
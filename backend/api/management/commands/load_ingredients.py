@@ -0,0 +1,125 @@
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import Ingredient, Recipe, Tag
+from api.cache import (INGREDIENTS_VERSION, TAGS_VERSION, bump_recipe_versions,
+                       bump_version)
+
+TAG_FIELDS = ('name', 'color')
+
+
+def read_records(path):
+    if path.suffix == '.csv':
+        with path.open(encoding='utf-8', newline='') as file:
+            yield from csv.DictReader(file)
+    elif path.suffix == '.json':
+        with path.open(encoding='utf-8') as file:
+            for record in json.load(file):
+                yield record.get('fields', record)
+    else:
+        raise CommandError(f'Неизвестный формат файла: {path}')
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты (и теги) из CSV или JSON пачками. '
+        'Повторный запуск добавляет только новые и меняет только '
+        'изменившиеся записи.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=settings.BASE_DIR.parent / 'data' / 'ingredients.csv',
+            type=Path,
+            help='CSV с колонками name, measurement_unit или JSON '
+                 '(в том числе фикстура loaddata).'
+        )
+        parser.add_argument('--tags', type=Path, help='Файл с тегами.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not options['path'].exists():
+            raise CommandError(f'Файл не найден: {options["path"]}')
+        start = perf_counter()
+        with transaction.atomic():
+            read, created = self.load_ingredients(
+                options['path'], options['batch_size']
+            )
+            if created:
+                transaction.on_commit(
+                    lambda: bump_version(INGREDIENTS_VERSION)
+                )
+            if options['tags']:
+                self.load_tags(options['tags'])
+        elapsed = perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Ингредиентов прочитано: {read}, добавлено: {created}, '
+            f'{read / elapsed:.0f} строк/с'
+        ))
+
+    @staticmethod
+    def load_ingredients(path, batch_size):
+        read = created = 0
+        for batch in batches(read_records(path), batch_size):
+            read += len(batch)
+            rows = {
+                (record['name'].strip(), record['measurement_unit'].strip())
+                for record in batch
+            }
+            rows -= set(Ingredient.objects.filter(
+                name__in={name for name, _ in rows}
+            ).values_list('name', 'measurement_unit'))
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=measurement_unit)
+                 for name, measurement_unit in sorted(rows)],
+                ignore_conflicts=True
+            )
+            created += len(rows)
+        return read, created
+
+    def load_tags(self, path):
+        if not path.exists():
+            raise CommandError(f'Файл не найден: {path}')
+        records = {record['slug']: record for record in read_records(path)}
+        existing = Tag.objects.in_bulk(records, field_name='slug')
+        changed = []
+        for slug, tag in existing.items():
+            if any(getattr(tag, field) != records[slug][field]
+                   for field in TAG_FIELDS):
+                for field in TAG_FIELDS:
+                    setattr(tag, field, records[slug][field])
+                changed.append(tag)
+        created = Tag.objects.bulk_create(
+            [Tag(slug=slug, **{field: record[field] for field in TAG_FIELDS})
+             for slug, record in records.items() if slug not in existing],
+            ignore_conflicts=True
+        )
+        Tag.objects.bulk_update(changed, TAG_FIELDS)
+        if created or changed:
+            recipe_ids = list(Recipe.tags.through.objects.filter(
+                tag__in=changed
+            ).values_list('recipe_id', flat=True))
+
+            def invalidate():
+                bump_version(TAGS_VERSION)
+                bump_recipe_versions(recipe_ids)
+
+            transaction.on_commit(invalidate)
+        self.stdout.write(
+            f'Тегов добавлено: {len(created)}, изменено: {len(changed)}'
+        )
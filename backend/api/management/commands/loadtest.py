@@ -0,0 +1,64 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.loadtest import plan, read_traffic, run, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Воспроизводит трафик из JSONL-файла и выводит пропускную '
+        'способность, p50/p95/p99 и число SQL-запросов по эндпоинтам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=settings.BASE_DIR.parent / 'data' / 'traffic.jsonl',
+            type=Path
+        )
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=1)
+        parser.add_argument(
+            '--base-url',
+            help='Адрес запущенного сервера. Без него запросы идут через '
+                 'тестовый клиент в этом процессе.'
+        )
+        parser.add_argument(
+            '--prefix', default='load',
+            help='Префикс имён пользователей, от которых идут запросы.'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        requests = plan(
+            read_traffic(options['path']),
+            options['requests'],
+            options['seed'],
+            options['prefix']
+        )
+        elapsed, results = run(
+            requests, max(1, options['concurrency']), options['base_url']
+        )
+        self.stdout.write(
+            f'{"эндпоинт":<20} {"запросов":>8} {"4xx":>5} {"сбоев":>5} '
+            f'{"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9} '
+            f'{"SQL ср.":>8} {"SQL макс":>8}'
+        )
+        for name, row in summarize(results).items():
+            queries = (
+                f'{row["queries"]:>8.1f} {row["max_queries"]:>8}'
+                if row['queries'] is not None else f'{"—":>8} {"—":>8}'
+            )
+            self.stdout.write(
+                f'{name:<20} {row["count"]:>8} {row["client_errors"]:>5} '
+                f'{row["failures"]:>5} {row["p50"] * 1000:>9.1f} '
+                f'{row["p95"] * 1000:>9.1f} {row["p99"] * 1000:>9.1f} '
+                f'{queries}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего {len(results)} запросов за {elapsed:.1f} с: '
+            f'{len(results) / elapsed:.1f} запросов/с'
+        ))
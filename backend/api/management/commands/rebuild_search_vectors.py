@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает поисковые векторы рецептов и сверяет их '
+        'с названием, описанием и ингредиентами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить векторы, ничего не изменяя.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Число рецептов в одном UPDATE.'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            stale = self.compare()
+            if stale:
+                raise CommandError(f'Устаревших векторов: {stale}')
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+
+        recipe_ids = list(Recipe.objects.order_by('pk').values_list(
+            'pk', flat=True
+        ))
+        batch_size = options['batch_size']
+        for start in range(0, len(recipe_ids), batch_size):
+            Recipe.objects.filter(
+                pk__in=recipe_ids[start:start + batch_size]
+            ).update_search_vector()
+        stale = self.compare()
+        if stale:
+            raise CommandError(
+                f'После пересчёта осталось устаревших векторов: {stale}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Векторы пересчитаны для {len(recipe_ids)} рецептов.'
+        ))
+
+    def compare(self):
+        stale = list(Recipe.objects.with_stale_search_vector().order_by(
+            'pk'
+        ).values_list('pk', 'name'))
+        for recipe_id, name in stale:
+            self.stdout.write(f'Рецепт {recipe_id} «{name}»: вектор устарел')
+        return len(stale)
@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingCartIngredient
+from api.shopping_list import bump_cart_versions, live_cart_totals
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает таблицу итогов списков покупок и сверяет её '
+        'с агрегатом по рецептам в корзинах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить таблицу, ничего не изменяя.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки при вставке строк.'
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatches = self.compare()
+            if mismatches:
+                raise CommandError(
+                    f'Расхождений с живым агрегатом: {mismatches}'
+                )
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+
+        with transaction.atomic():
+            user_ids = set(ShoppingCartIngredient.objects.values_list(
+                'user_id', flat=True
+            ))
+            ShoppingCartIngredient.objects.all().delete()
+            rows = [
+                ShoppingCartIngredient(
+                    user_id=user_id, ingredient_id=ingredient_id,
+                    amount=amount
+                )
+                for user_id, ingredient_id, amount in live_cart_totals()
+            ]
+            ShoppingCartIngredient.objects.bulk_create(
+                rows, batch_size=options['batch_size']
+            )
+            user_ids.update(row.user_id for row in rows)
+            transaction.on_commit(lambda: bump_cart_versions(user_ids))
+        mismatches = self.compare()
+        if mismatches:
+            raise CommandError(
+                f'После пересборки осталось расхождений: {mismatches}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Таблица пересобрана: {len(rows)} строк '
+            f'для {len(user_ids)} пользователей.'
+        ))
+
+    def compare(self):
+        live = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in live_cart_totals()
+        }
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in
+            ShoppingCartIngredient.objects.values_list(
+                'user_id', 'ingredient_id', 'amount'
+            )
+        }
+        mismatches = 0
+        for key in live.keys() | stored.keys():
+            if live.get(key) != stored.get(key):
+                mismatches += 1
+                user_id, ingredient_id = key
+                self.stdout.write(
+                    f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                    f'в таблице {stored.get(key)}, по рецептам {live.get(key)}'
+                )
+        return mismatches
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.counters import counter_drift, recalculate_counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет счётчики избранного, рецептов и подписчиков с таблицами '
+        'связей и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить счётчики, ничего не изменяя.'
+        )
+
+    def handle(self, *args, **options):
+        mismatches = self.compare()
+        if options['check']:
+            if mismatches:
+                raise CommandError(
+                    f'Расхождений со связанными строками: {mismatches}'
+                )
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+            return
+
+        with transaction.atomic():
+            recalculate_counters()
+        remaining = sum(1 for _ in counter_drift())
+        if remaining:
+            raise CommandError(
+                f'После пересчёта осталось расхождений: {remaining}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны, исправлено расхождений: {mismatches}.'
+        ))
+
+    def compare(self):
+        mismatches = 0
+        for model, counter, pk, stored, live in counter_drift():
+            mismatches += 1
+            self.stdout.write(
+                f'{model._meta.verbose_name} {pk}, {counter}: '
+                f'сохранено {stored}, по связям {live}'
+            )
+        return mismatches
@@ -0,0 +1,292 @@
+import json
+import logging
+import random
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.renderers import BaseRenderer
+
+from .cache import recipe_cache
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса, попавшего в выборку."""
+
+    def __init__(self):
+        self.queries = Counter()
+        self.db_time = 0
+        self.serializer_time = 0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - start
+            self.queries[sql] += 1
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicates(self):
+        return sum(count - 1 for count in self.queries.values())
+
+    def most_duplicated(self):
+        for sql, count in self.queries.most_common(1):
+            if count > 1:
+                return sql[:settings.METRICS_SQL_PREVIEW], count
+        return None, 0
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """Подключает учёт SQL к каждому новому соединению.
+
+    Запросы попадают в метрики того запроса, в контексте которого
+    выполняются, в каком бы потоке ни работало соединение: синхронные
+    view под ASGI и асинхронные view из ``async_views`` ходят в базу
+    не из потока middleware.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def timed_representation(method):
+    """Учитывает время сериализации в метриках запроса.
+
+    Вложенные сериализаторы не считаются повторно: время идёт только
+    у самого внешнего.
+    """
+    @wraps(method)
+    def wrapper(self, instance):
+        metrics = _current.get()
+        if metrics is None:
+            return method(self, instance)
+        metrics.serializer_depth += 1
+        start = perf_counter()
+        try:
+            return method(self, instance)
+        finally:
+            metrics.serializer_depth -= 1
+            if not metrics.serializer_depth:
+                metrics.serializer_time += perf_counter() - start
+    return wrapper
+
+
+class TimedRepresentationMixin:
+
+    @timed_representation
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
+
+class Registry:
+    """Агрегаты по маршрутам для выдачи в формате Prometheus.
+
+    Значения живут в памяти процесса: при нескольких воркерах каждый
+    отдаёт свои.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.lock = Lock()
+        self.requests = Counter()
+        self.durations = defaultdict(float)
+        self.histograms = defaultdict(lambda: [0] * (len(self.buckets) + 1))
+        self.sampled = Counter()
+        self.sampled_totals = defaultdict(Counter)
+
+    def observe(self, route, method, status, duration, metrics=None):
+        with self.lock:
+            self.requests[route, method, status] += 1
+            self.durations[route] += duration
+            self.histograms[route][bisect_left(self.buckets, duration)] += 1
+            if metrics is not None:
+                self.sampled[route] += 1
+                self.sampled_totals[route].update({
+                    'db_queries': metrics.query_count,
+                    'db_duplicate_queries': metrics.duplicates,
+                    'db_seconds': metrics.db_time,
+                    'serializer_seconds': metrics.serializer_time,
+                })
+
+    def render(self):
+        with self.lock:
+            lines = [
+                '# HELP foodgram_requests_total Обработанные запросы.',
+                '# TYPE foodgram_requests_total counter',
+            ]
+            lines += [
+                f'foodgram_requests_total{{route="{route}",'
+                f'method="{method}",status="{status}"}} {count}'
+                for (route, method, status), count
+                in sorted(self.requests.items())
+            ]
+            lines += [
+                '# HELP foodgram_request_duration_seconds Время ответа.',
+                '# TYPE foodgram_request_duration_seconds histogram',
+            ]
+            for route, counts in sorted(self.histograms.items()):
+                total = 0
+                for bound, count in zip(
+                    (*self.buckets, '+Inf'), counts
+                ):
+                    total += count
+                    lines.append(
+                        f'foodgram_request_duration_seconds_bucket'
+                        f'{{route="{route}",le="{bound}"}} {total}'
+                    )
+                lines += [
+                    f'foodgram_request_duration_seconds_sum'
+                    f'{{route="{route}"}} {self.durations[route]:.6f}',
+                    f'foodgram_request_duration_seconds_count'
+                    f'{{route="{route}"}} {total}',
+                ]
+            lines += [
+                '# HELP foodgram_sampled_requests_total Запросы, для '
+                'которых собраны SQL и время сериализации.',
+                '# TYPE foodgram_sampled_requests_total counter',
+            ]
+            lines += [
+                f'foodgram_sampled_requests_total{{route="{route}"}} {count}'
+                for route, count in sorted(self.sampled.items())
+            ]
+            for name in ('db_queries', 'db_duplicate_queries', 'db_seconds',
+                         'serializer_seconds'):
+                lines += [
+                    f'# HELP foodgram_{name}_total Сумма по запросам '
+                    f'из выборки.',
+                    f'# TYPE foodgram_{name}_total counter',
+                ]
+                lines += [
+                    f'foodgram_{name}_total{{route="{route}"}} '
+                    f'{totals[name]:g}'
+                    for route, totals in sorted(self.sampled_totals.items())
+                ]
+        stats = recipe_cache.stats()
+        lines += [
+            '# HELP foodgram_recipe_cache_total Обращения к кэшу рецептов.',
+            '# TYPE foodgram_recipe_cache_total counter',
+            f'foodgram_recipe_cache_total{{result="hit"}} {stats["hits"]}',
+            f'foodgram_recipe_cache_total{{result="miss"}} {stats["misses"]}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(settings.METRICS_DURATION_BUCKETS)
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unmatched'
+
+
+class MetricsMiddleware:
+    """Замеряет запросы и отдаёт результат в Server-Timing и в лог.
+
+    Время ответа считается всегда. SQL-запросы, их время, повторы
+    одного и того же SQL (признак N+1) и время сериализации собираются
+    только для доли ``METRICS_SAMPLE_RATE`` запросов. Работает и под
+    WSGI, и под ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = self.sample()
+        token = _current.set(metrics)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, perf_counter() - start, metrics)
+
+    async def __acall__(self, request):
+        metrics = self.sample()
+        token = _current.set(metrics)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, perf_counter() - start, metrics)
+
+    @staticmethod
+    def sample():
+        if random.random() < settings.METRICS_SAMPLE_RATE:
+            return RequestMetrics()
+        return None
+
+    @staticmethod
+    def finish(request, response, duration, metrics):
+        route = route_name(request)
+        registry.observe(
+            route, request.method, response.status_code, duration, metrics
+        )
+        if metrics is None:
+            response['Server-Timing'] = f'total;dur={duration * 1000:.1f}'
+            return response
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{metrics.query_count} queries"',
+            f'db-duplicates;desc="{metrics.duplicates} duplicated"',
+            f'serializer;dur={metrics.serializer_time * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ))
+        duplicated_sql, duplicated_count = metrics.most_duplicated()
+        logger.info(json.dumps({
+            'route': route,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'db_queries': metrics.query_count,
+            'db_duplicate_queries': metrics.duplicates,
+            'db_ms': round(metrics.db_time * 1000, 1),
+            'serializer_ms': round(metrics.serializer_time * 1000, 1),
+            'most_duplicated_sql': duplicated_sql,
+            'most_duplicated_count': duplicated_count,
+        }, ensure_ascii=False))
+        return response
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, str):
+            data = f'# {data.get("detail", data)}\n'
+        return data.encode(self.charset)
@@ -1,7 +1,53 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class IdCursorPagination(CursorPagination):
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 24
+    ordering = '-id'
+    supported_orderings = ((), ('id',), ('-id',))
+
+    def get_ordering(self, request, queryset, view):
+        return self.queryset_ordering(queryset) or (self.ordering,)
+
+    @staticmethod
+    def queryset_ordering(queryset):
+        return tuple(
+            queryset.query.order_by or queryset.model._meta.ordering
+        )
+
+    @classmethod
+    def supports(cls, queryset):
+        return cls.queryset_ordering(queryset) in cls.supported_orderings
 
 
 class CustomPagination(PageNumberPagination):
+    """Постраничная пагинация с курсорным режимом по ``?pagination=cursor``.
+
+    Курсор строится только по id. Для другой сортировки (поиск,
+    ``?ordering=popular``) курсорный режим молча переходит на номера
+    страниц: ссылка next в ответе всё равно ведёт на следующую страницу.
+    """
     page_size = 6
     page_size_query_param = 'limit'
     max_page_size = 24
+    mode_query_param = 'pagination'
+    cursor_pagination_class = IdCursorPagination
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            and self.cursor_pagination_class.supports(queryset)
+        ):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from recipes.models import Favourite, Ingredient, Recipe, ShoppingCart
+from users.models import Subscribe
+
+from .synthetic import Generator
+
+User = get_user_model()
+
+INGREDIENT_PREFIX = 'мол'
+
+
+class HotQueries:
+    """Горячие запросы API и таблицы, которые они не должны читать целиком.
+
+    Данные создаются генератором, затем собирается статистика, чтобы
+    планировщик выбирал план так же, как на заполненной базе.
+    """
+    seed = 0
+
+    def __init__(self, users, recipes):
+        user_ids, recipe_ids = Generator('plans', self.seed).run(
+            users, recipes, favorites=10, cart=5, subscriptions=5
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        users = User.objects.filter(pk__in=user_ids)
+        self.user = users.order_by('-recipes_count', 'pk').first()
+        self.author = users.filter(recipes_count__gt=0).order_by(
+            'recipes_count', 'pk'
+        ).first()
+        self.recipe = Recipe.objects.filter(pk__in=recipe_ids).order_by(
+            '-favorites_count', 'pk'
+        ).first()
+
+    def queries(self):
+        user, author, recipe = self.user, self.author, self.recipe
+        return {
+            'ingredient_prefix': (
+                Ingredient.objects.filter(name__startswith=INGREDIENT_PREFIX),
+                (Ingredient,)
+            ),
+            'recipes_by_author': (
+                Recipe.objects.filter(author=author).order_by('-id')[:6],
+                (Recipe,)
+            ),
+            'recipes_popular': (
+                Recipe.objects.order_by('-favorites_count', '-id')[:6],
+                (Recipe,)
+            ),
+            'recipes_favorited': (
+                Recipe.objects.filter(favorites__user=user)[:6],
+                (Recipe, Favourite)
+            ),
+            'recipes_in_shopping_cart': (
+                Recipe.objects.filter(shopping_cart__user=user)[:6],
+                (Recipe, ShoppingCart)
+            ),
+            'recipe_flags': (
+                Recipe.objects.with_user_flags(user).filter(pk=recipe.pk),
+                (Recipe, Favourite, ShoppingCart, Subscribe)
+            ),
+            'favorited_by': (
+                Favourite.objects.filter(recipe=recipe).values('user'),
+                (Favourite,)
+            ),
+            'in_shopping_carts': (
+                ShoppingCart.objects.filter(recipe=recipe).values('user'),
+                (ShoppingCart,)
+            ),
+            'subscriptions': (
+                User.objects.filter(subscribing__user=user)[:6],
+                (User, Subscribe)
+            ),
+            'subscribers': (
+                Subscribe.objects.filter(author=user).values('user'),
+                (Subscribe,)
+            ),
+        }
+
+    def check(self):
+        """Возвращает план и найденные полные просмотры для каждого запроса."""
+        results = {}
+        for name, (queryset, models) in self.queries().items():
+            plan = queryset.explain()
+            results[name] = plan, [
+                model._meta.db_table for model in models
+                if f'Seq Scan on {model._meta.db_table}' in plan
+            ]
+        return results
@@ -1,18 +1,28 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Manager
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework.exceptions import ValidationError
-from rest_framework.fields import IntegerField, SerializerMethodField
-from rest_framework.relations import PrimaryKeyRelatedField
-from rest_framework.serializers import CharField, ModelSerializer
+from rest_framework.fields import (BooleanField, ChoiceField, IntegerField,
+                                   ListField, SerializerMethodField)
+from rest_framework.serializers import (CharField, ListSerializer,
+                                        ModelSerializer, Serializer)
+from rest_framework.settings import api_settings
 from rest_framework.status import HTTP_400_BAD_REQUEST
 
 from recipes.models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingCartIngredient, Tag)
 from users.models import Subscribe
 
+from .cache import recipe_cache
+from .counters import change_counter
+from .fields import (BulkRelatedListSerializer, PrimaryKeyListField,
+                     RenditionImageField, StreamingBase64ImageField)
+from .images import reset_renditions, schedule_renditions
+from .metrics import TimedRepresentationMixin, timed_representation
+from .shopping_list import FORMATS, apply_cart_delta, lock_recipes
+
 User = get_user_model()
 
 
@@ -25,7 +35,7 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         )
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(TimedRepresentationMixin, UserSerializer):
     is_subscribed = SerializerMethodField(read_only=True)
 
     class Meta:
@@ -40,6 +50,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return (request is not None and request.user.is_authenticated
                 and obj.subscribing.filter(user_id=request.user.id).exists())
@@ -47,51 +59,71 @@ class CustomUserSerializer(UserSerializer):
 
 class SubscribeSerializer(CustomUserSerializer):
     recipes = SerializerMethodField()
-    recipes_count = SerializerMethodField()
 
     class Meta(CustomUserSerializer.Meta):
         fields = CustomUserSerializer.Meta.fields + (
-            'recipes_count', 'recipes'
+            'recipes_count', 'subscribers_count', 'recipes'
         )
         read_only_fields = ('email', 'username')
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            try:
-                recipes = recipes[:int(limit)]
-            except ValueError:
-                return ('Ошибка значения: limit должен быть целым числом.')
-        serializer = RecipeShortSerializer(recipes, many=True, read_only=True)
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            limit = self.context.get('recipes_limit')
+            if limit is not None:
+                recipes = recipes[:limit]
+        serializer = RecipeShortSerializer(recipes, many=True, read_only=True,
+                                           context=self.context)
         return serializer.data
 
 
-class SubscribePostSerializer(ModelSerializer):
+class RecipesLimitSerializer(Serializer):
+    recipes_limit = IntegerField(
+        min_value=0,
+        required=False,
+        error_messages={
+            'invalid': 'Ошибка значения: limit должен быть целым числом.'
+        }
+    )
+
+
+class CreateOnceMixin:
+    """Создаёт связь одним INSERT, полагаясь на уникальное ограничение.
+
+    Повтор, в том числе от параллельного запроса, превращается в ошибку
+    400 с текстом ``error_message``.
+    """
+    error_message: str
+
+    def create(self, validated_data):
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            raise ValidationError(
+                detail={api_settings.NON_FIELD_ERRORS_KEY: [
+                    self.error_message
+                ]},
+                code=HTTP_400_BAD_REQUEST
+            )
+
+
+class SubscribePostSerializer(CreateOnceMixin, ModelSerializer):
     user_id = IntegerField()
     author_id = IntegerField()
+    error_message = 'Вы уже подписаны на этого пользователя!'
 
     class Meta:
         model = Subscribe
         fields = ('user_id', 'author_id')
 
     def validate(self, data):
-        user = User.objects.get(id=data.get('user_id'))
-        author = User.objects.get(id=data.get('author_id'))
-        if author == user:
+        if data['author_id'] == data['user_id']:
             raise ValidationError(
                 detail='Вы не можете подписаться на самого себя!',
                 code=HTTP_400_BAD_REQUEST
             )
-        if user.subscriber.filter(author=author).exists():
-            raise ValidationError(
-                detail='Вы уже подписаны на этого пользователя!',
-                code=HTTP_400_BAD_REQUEST
-            )
         return data
 
     def to_representation(self, instance):
@@ -99,20 +131,49 @@ class SubscribePostSerializer(ModelSerializer):
         return serializer.data
 
 
-class IngredientSerializer(ModelSerializer):
+class ShoppingListFormatSerializer(Serializer):
+    type = ChoiceField(choices=tuple(FORMATS), default='txt')
+
+
+class BulkRecipesSerializer(Serializer):
+    recipes = ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_RECIPES_MAX,
+        error_messages={
+            'empty': 'Передайте хотя бы один рецепт.',
+            'max_length': 'За раз можно передать не больше '
+                          '{max_length} рецептов.',
+        }
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
+class IngredientSearchSerializer(Serializer):
+    name = CharField(allow_blank=True)
+    limit = IntegerField(min_value=1, default=settings.INGREDIENT_SEARCH_LIMIT)
+    fuzzy = BooleanField(default=settings.INGREDIENT_SEARCH_FUZZY)
+
+    def validate_limit(self, value):
+        return min(value, settings.INGREDIENT_SEARCH_MAX_LIMIT)
+
+
+class IngredientSerializer(TimedRepresentationMixin, ModelSerializer):
     class Meta:
         model = Ingredient
         fields = '__all__'
 
 
-class TagSerializer(ModelSerializer):
+class TagSerializer(TimedRepresentationMixin, ModelSerializer):
     class Meta:
         model = Tag
         fields = '__all__'
 
 
-class RecipeShortSerializer(ModelSerializer):
-    image = Base64ImageField()
+class RecipeShortSerializer(TimedRepresentationMixin, ModelSerializer):
+    image = RenditionImageField('thumbnail')
 
     class Meta:
         model = Recipe
@@ -124,7 +185,7 @@ class RecipeShortSerializer(ModelSerializer):
         )
 
 
-class GetAmountIngredientSerializer(ModelSerializer):
+class GetAmountIngredientSerializer(TimedRepresentationMixin, ModelSerializer):
     id = IntegerField(
         source='ingredient.id',
         read_only=True
@@ -143,12 +204,50 @@ class GetAmountIngredientSerializer(ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
-class RecipeReadSerializer(ModelSerializer):
+class ShoppingCartIngredientSerializer(GetAmountIngredientSerializer):
+
+    class Meta(GetAmountIngredientSerializer.Meta):
+        model = ShoppingCartIngredient
+
+
+class CachedRecipeListSerializer(ListSerializer):
+    """Список рецептов, читающий кэш представлений пачкой.
+
+    Версии и представления всех рецептов страницы берутся двумя
+    get_many, промахи записываются одним set_many, а не по два-три
+    обращения к кэшу на каждый рецепт.
+    """
+
+    @timed_representation
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, Manager) else data)
+        child = self.child
+        versions = recipe_cache.versions(recipe.pk for recipe in recipes)
+        keys = [
+            child.cache_key(recipe, versions[recipe.pk]) for recipe in recipes
+        ]
+        cached = recipe_cache.get_many(keys)
+        representations = []
+        misses = {}
+        for recipe, key in zip(recipes, keys):
+            item = cached.get(key)
+            if item is None:
+                item = child.represent(recipe)
+                misses[key] = (item, versions[recipe.pk])
+            else:
+                item = child.personalize(recipe, item)
+            representations.append(item)
+        if misses:
+            recipe_cache.set_many(misses, self.context.get('cache_snapshot'))
+        return representations
+
+
+class RecipeReadSerializer(TimedRepresentationMixin, ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
     ingredients = GetAmountIngredientSerializer(source='ingredient_list',
                                                 many=True)
-    image = Base64ImageField()
+    image = RenditionImageField('card')
     is_favorited = SerializerMethodField(read_only=True)
     is_in_shopping_cart = SerializerMethodField(read_only=True)
 
@@ -165,26 +264,85 @@ class RecipeReadSerializer(ModelSerializer):
             'image',
             'text',
             'cooking_time',
+            'favorites_count',
         )
+        list_serializer_class = CachedRecipeListSerializer
+
+    @timed_representation
+    def to_representation(self, instance):
+        version = recipe_cache.version(instance.pk)
+        key = self.cache_key(instance, version)
+        data = recipe_cache.get(key)
+        if data is None:
+            data = self.represent(instance)
+            recipe_cache.set(
+                key, data, version, self.context.get('cache_snapshot')
+            )
+            return data
+        return self.personalize(instance, data)
+
+    def cache_key(self, instance, version):
+        return recipe_cache.key(
+            instance.pk,
+            version,
+            self.context.get('request'),
+            self.fields['image'].rendition
+        )
+
+    def represent(self, instance):
+        """Полное представление рецепта без кэша."""
+        self.attach_subscription(instance)
+        return super().to_representation(instance)
+
+    def personalize(self, instance, data):
+        """Подставляет в закэшированное представление поля пользователя."""
+        self.attach_subscription(instance)
+        data['is_favorited'] = self.get_is_favorited(instance)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(instance)
+        data['favorites_count'] = instance.favorites_count
+        if data['author'] is not None:
+            data['author']['is_subscribed'] = (
+                self.fields['author'].get_is_subscribed(instance.author)
+            )
+        return data
+
+    @staticmethod
+    def attach_subscription(instance):
+        if hasattr(instance, 'author_is_subscribed') and instance.author:
+            instance.author.is_subscribed = instance.author_is_subscribed
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return (request is not None and request.user.is_authenticated
                 and request.user.favorites.filter(recipe=obj).exists())
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return (request is not None and request.user.is_authenticated
                 and request.user.shopping_cart.filter(recipe=obj).exists())
 
 
+class RecipeDetailSerializer(RecipeReadSerializer):
+    image = RenditionImageField('detail')
+
+
 class IngredientInRecipeWriteSerializer(ModelSerializer):
-    id = PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = IntegerField(min_value=1)
     amount = IntegerField(min_value=settings.MIN_VAL_AMOUNT,
                           max_value=settings.MAX_VAL_AMOUNT)
 
+    related_querysets = {'id': Ingredient.objects.all()}
+    default_error_messages = {
+        'does_not_exist': 'Ингредиенты с id {ids} не существуют.',
+    }
+
     class Meta:
         model = IngredientInRecipe
+        list_serializer_class = BulkRelatedListSerializer
         fields = (
             'id',
             'amount'
@@ -192,11 +350,13 @@ class IngredientInRecipeWriteSerializer(ModelSerializer):
 
 
 class RecipeWriteSerializer(ModelSerializer):
-    tags = PrimaryKeyRelatedField(queryset=Tag.objects.all(),
-                                  many=True)
+    tags = PrimaryKeyListField(
+        queryset=Tag.objects.all(),
+        error_messages={'does_not_exist': 'Теги с id {ids} не существуют.'}
+    )
     author = CustomUserSerializer(read_only=True)
     ingredients = IngredientInRecipeWriteSerializer(many=True)
-    image = Base64ImageField()
+    image = StreamingBase64ImageField()
     cooking_time = IntegerField(min_value=settings.MIN_VAL_COOK,
                                 max_value=settings.MAX_VAL_COOK)
 
@@ -252,33 +412,94 @@ class RecipeWriteSerializer(ModelSerializer):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(author=author, **validated_data)
+        change_counter(
+            User.objects.filter(pk=author.pk), 'recipes_count', 1
+        )
         recipe.tags.set(tags)
         self.create_ingredients_amounts(recipe=recipe, ingredients=ingredients)
+        schedule_renditions(recipe.pk)
         return recipe
 
+    @staticmethod
+    def update_tags(recipe, tags):
+        current = {tag.pk for tag in recipe.tags.all()}
+        submitted = {tag.pk for tag in tags}
+        if current - submitted:
+            recipe.tags.remove(*(current - submitted))
+        if submitted - current:
+            recipe.tags.add(*(submitted - current))
+
+    @staticmethod
+    def update_ingredients_amounts(recipe, ingredients):
+        """Приводит ингредиенты рецепта к присланным и возвращает разницу.
+
+        Меняются только строки, которые действительно отличаются.
+        Строки читаются заново, а не из prefetch: рецепт уже заблокирован,
+        и разница должна считаться от состояния под блокировкой.
+        """
+        existing = {
+            row.ingredient_id: row
+            for row in IngredientInRecipe.objects.filter(recipe=recipe)
+        }
+        submitted = {
+            item['id'].pk: item['amount'] for item in ingredients
+        }
+        created, changed, delta = [], [], {}
+        for ingredient_id, amount in submitted.items():
+            row = existing.get(ingredient_id)
+            if row is None:
+                created.append(IngredientInRecipe(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
+                ))
+                delta[ingredient_id] = amount
+            elif row.amount != amount:
+                delta[ingredient_id] = amount - row.amount
+                row.amount = amount
+                changed.append(row)
+        removed = existing.keys() - submitted.keys()
+        for ingredient_id in removed:
+            delta[ingredient_id] = -existing[ingredient_id].amount
+        IngredientInRecipe.objects.bulk_create(created)
+        IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        if removed:
+            IngredientInRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        return delta
+
     @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
+        lock_recipes([instance.pk])
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        if 'image' in validated_data:
+            reset_renditions(instance)
+            schedule_renditions(instance.pk)
         instance = super().update(instance, validated_data)
-        instance.tags.clear()
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_ingredients_amounts(
-            recipe=instance, ingredients=ingredients)
-        instance.save()
+        if tags is not None:
+            self.update_tags(instance, tags)
+        delta = {}
+        if ingredients is not None:
+            delta = self.update_ingredients_amounts(instance, ingredients)
+        if delta:
+            apply_cart_delta(
+                instance.shopping_cart.values_list('user_id', flat=True),
+                delta
+            )
         return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
-        return RecipeReadSerializer(instance, context=context).data
+        instance = Recipe.objects.with_related().with_user_flags(
+            request.user
+        ).get(pk=instance.pk)
+        return RecipeDetailSerializer(instance, context=context).data
 
 
-class CreateBaseSerializer(ModelSerializer):
+class CreateBaseSerializer(CreateOnceMixin, ModelSerializer):
     user_id = IntegerField()
     recipe_id = IntegerField()
-    error_message: str
 
     def __init__(self, data, error_message):
         super().__init__(data=data)
@@ -290,17 +511,6 @@ class CreateBaseSerializer(ModelSerializer):
         )
         return serializer.data
 
-    def validate(self, data):
-        if self.Meta.model.objects.filter(
-            user_id=data['user_id'],
-            recipe_id=data['recipe_id']
-        ).exists():
-            raise ValidationError(
-                detail=self.error_message,
-                code=HTTP_400_BAD_REQUEST
-            )
-        return data
-
 
 class FavouriteSerializer(CreateBaseSerializer):
     class Meta:
@@ -0,0 +1,213 @@
+import csv
+from datetime import datetime
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipes.models import IngredientInRecipe, Recipe, ShoppingCartIngredient
+
+from .cache import bump_version, get_version
+
+User = get_user_model()
+
+ROWS_KEY = 'shopping_list:{user_id}:{version}'
+PDF_FONT_NAME = 'ShoppingListFont'
+PDF_FONT_SIZE = 12
+PDF_LINE_HEIGHT = 18
+PDF_MARGIN = 50
+
+
+def cart_version_name(user_id):
+    return f'shopping_cart:{user_id}'
+
+
+def bump_cart_versions(user_ids):
+    names = [cart_version_name(user_id) for user_id in set(user_ids)]
+    if names:
+        bump_version(*names)
+
+
+def lock_recipes(recipe_ids):
+    """Блокирует рецепты до конца транзакции, по возрастанию pk.
+
+    Изменения корзины и правка ингредиентов рецепта читают количества
+    и состав корзин только под этой блокировкой, иначе их дельты
+    перекрываются и итоги расходятся с рецептами. Рецепты блокируются
+    раньше пользователей во всех путях, чтобы они не ждали друг друга.
+    """
+    list(Recipe.objects.select_for_update().filter(
+        pk__in=recipe_ids
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def recipe_amounts(recipe_ids):
+    return dict(
+        IngredientInRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values('ingredient').annotate(
+            total=Sum('amount')
+        ).values_list('ingredient', 'total').order_by()
+    )
+
+
+def live_cart_totals():
+    return IngredientInRecipe.objects.filter(
+        recipe__shopping_cart__isnull=False
+    ).values_list(
+        'recipe__shopping_cart__user', 'ingredient'
+    ).annotate(
+        amount=Sum('amount')
+    ).order_by()
+
+
+@transaction.atomic
+def apply_cart_delta(user_ids, delta):
+    user_ids = set(user_ids)
+    delta = {
+        ingredient_id: amount
+        for ingredient_id, amount in delta.items() if amount
+    }
+    if not user_ids or not delta:
+        return
+    list(User.objects.select_for_update().filter(
+        pk__in=user_ids
+    ).order_by('pk').values_list('pk', flat=True))
+    existing = {
+        (row.user_id, row.ingredient_id): row
+        for row in ShoppingCartIngredient.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=delta
+        )
+    }
+    created, changed, removed = [], [], []
+    for user_id in user_ids:
+        for ingredient_id, amount in delta.items():
+            row = existing.get((user_id, ingredient_id))
+            if row is None:
+                if amount > 0:
+                    created.append(ShoppingCartIngredient(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=amount
+                    ))
+                continue
+            row.amount += amount
+            if row.amount > 0:
+                changed.append(row)
+            else:
+                removed.append(row.pk)
+    ShoppingCartIngredient.objects.bulk_create(created)
+    ShoppingCartIngredient.objects.bulk_update(changed, ['amount'])
+    ShoppingCartIngredient.objects.filter(pk__in=removed).delete()
+    transaction.on_commit(lambda: bump_cart_versions(user_ids))
+
+
+def add_to_cart_totals(user_ids, recipe_ids):
+    apply_cart_delta(user_ids, recipe_amounts(recipe_ids))
+
+
+def remove_from_cart_totals(user_ids, recipe_ids):
+    apply_cart_delta(user_ids, {
+        ingredient_id: -amount
+        for ingredient_id, amount in recipe_amounts(recipe_ids).items()
+    })
+
+
+def get_rows(user):
+    key = ROWS_KEY.format(
+        user_id=user.id, version=get_version(cart_version_name(user.id))
+    )
+    rows = cache.get(key)
+    if rows is not None:
+        return rows
+    queryset = ShoppingCartIngredient.objects.filter(
+        user=user
+    ).values_list(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'amount'
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
+    return _cache_rows(
+        key, queryset.iterator(chunk_size=settings.SHOPPING_LIST_CHUNK_SIZE)
+    )
+
+
+def _cache_rows(key, rows):
+    fetched = []
+    for row in rows:
+        fetched.append(row)
+        yield row
+    cache.set(key, fetched, settings.SHOPPING_LIST_CACHE_TIMEOUT)
+
+
+def _header(user, today):
+    return (
+        f'Список покупок для: {user.get_full_name()}',
+        f'Дата: {today:%Y-%m-%d}',
+    )
+
+
+def render_txt(user, rows):
+    today = datetime.today()
+    yield '\n\n'.join(_header(user, today)) + '\n\n'
+    separator = ''
+    for name, measurement_unit, amount in rows:
+        yield f'{separator}- {name} ({measurement_unit}) - {amount}'
+        separator = '\n'
+    yield f'\n\nFoodgram ({today:%Y})'
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+def render_csv(user, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render_pdf(user, rows):
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT_NAME, settings.SHOPPING_LIST_FONT)
+        )
+    today = datetime.today()
+    buffer = BytesIO()
+    page = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    lines = [*_header(user, today), '']
+    lines += [
+        f'- {name} ({measurement_unit}) - {amount}'
+        for name, measurement_unit, amount in rows
+    ]
+    lines += ['', f'Foodgram ({today:%Y})']
+    y = height - PDF_MARGIN
+    page.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+    for line in lines:
+        if y < PDF_MARGIN:
+            page.showPage()
+            page.setFont(PDF_FONT_NAME, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        page.drawString(PDF_MARGIN, y, line)
+        y -= PDF_LINE_HEIGHT
+    page.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(settings.SHOPPING_LIST_PDF_CHUNK), b'')
+
+
+FORMATS = {
+    'txt': ('text/plain; charset=utf-8', render_txt),
+    'csv': ('text/csv; charset=utf-8', render_csv),
+    'pdf': ('application/pdf', render_pdf),
+}
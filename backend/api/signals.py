@@ -0,0 +1,133 @@
+from threading import local
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from .authentication import forget_tokens
+from .cache import (INGREDIENTS_VERSION, TAGS_VERSION, bump_recipe_versions,
+                    bump_version)
+
+User = get_user_model()
+
+SEARCH_VECTOR_FIELDS = {'name', 'text'}
+
+_pending_search_vectors = local()
+
+
+def invalidate_recipes(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    transaction.on_commit(lambda: bump_recipe_versions(recipe_ids))
+
+
+def refresh_search_vectors(recipe_ids):
+    """Пересчитывает search_vector рецептов после коммита.
+
+    Рецепты всех изменений потока копятся в одном множестве, и первый
+    же обработчик после коммита обновляет их одним UPDATE: сохранение
+    рецепта с инлайном ингредиентов в админке не даёт запроса на строку.
+    Рецепты из откатанной транзакции пересчитываются при следующем
+    коммите, это безвредно.
+    """
+    pending = getattr(_pending_search_vectors, 'ids', None)
+    if pending is None:
+        pending = _pending_search_vectors.ids = set()
+    pending.update(recipe_ids)
+    transaction.on_commit(_flush_search_vectors)
+
+
+def _flush_search_vectors():
+    recipe_ids = _pending_search_vectors.ids
+    _pending_search_vectors.ids = set()
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).update_search_vector()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(INGREDIENTS_VERSION))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(sender, **kwargs):
+    transaction.on_commit(lambda: bump_version(TAGS_VERSION))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(ingredients=instance).update_search_vector()
+
+
+@receiver((post_save, pre_delete), sender=Ingredient)
+def ingredient_recipes_changed(sender, instance, **kwargs):
+    invalidate_recipes(
+        instance.recipes.values_list('pk', flat=True).distinct()
+    )
+
+
+@receiver((post_save, pre_delete), sender=Tag)
+def tag_recipes_changed(sender, instance, **kwargs):
+    invalidate_recipes(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipes([instance.pk])
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    invalidate_recipes([instance.recipe_id])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_text_changed(sender, instance, update_fields, **kwargs):
+    if update_fields and not SEARCH_VECTOR_FIELDS & set(update_fields):
+        return
+    refresh_search_vectors([instance.pk])
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    refresh_search_vectors([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            invalidate_recipes([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        invalidate_recipes(pk_set)
+    elif action == 'pre_clear':
+        invalidate_recipes(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_recipes(instance.recipes.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    key = instance.key
+    transaction.on_commit(lambda: forget_tokens([key]))
+
+
+@receiver(post_save, sender=User)
+def user_credentials_changed(sender, instance, created, update_fields,
+                             **kwargs):
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    keys = list(Token.objects.filter(
+        user=instance
+    ).values_list('key', flat=True))
+    transaction.on_commit(lambda: forget_tokens(keys))
@@ -0,0 +1,219 @@
+import random
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, ShoppingCartIngredient, Tag)
+from users.models import Subscribe
+
+from .counters import recalculate_counters
+from .images import make_renditions
+from .shopping_list import apply_cart_delta, recipe_amounts
+
+User = get_user_model()
+
+PASSWORD = 'Foodgram+123'
+WORDS = (
+    'суп', 'салат', 'пирог', 'рагу', 'паста', 'запеканка', 'омлет', 'каша',
+    'плов', 'котлеты', 'блины', 'ризотто', 'борщ', 'соус', 'десерт', 'рулет',
+)
+ADJECTIVES = (
+    'домашний', 'быстрый', 'острый', 'летний', 'сытный', 'лёгкий',
+    'праздничный', 'постный', 'бабушкин', 'пряный', 'нежный', 'весенний',
+)
+
+
+def skewed_sample(rng, population, weights, k):
+    """Выбирает k разных элементов, чаще — с большим весом."""
+    k = min(k, len(population))
+    chosen = set()
+    while len(chosen) < k:
+        chosen.update(rng.choices(population, weights, k=k - len(chosen)))
+    return list(chosen)
+
+
+def zipf_weights(size):
+    return [1 / rank for rank in range(1, size + 1)]
+
+
+def make_image():
+    buffer = BytesIO()
+    Image.linear_gradient('L').resize((960, 640)).convert('RGB').save(
+        buffer, 'JPEG', quality=85
+    )
+    return buffer.getvalue()
+
+
+class Generator:
+    """Массово создаёт пользователей, рецепты и связи между ними.
+
+    Число ингредиентов и тегов у рецепта и популярность рецептов и авторов
+    распределены неравномерно, как на живом сайте: немногие рецепты
+    собирают большую часть избранного, корзин и подписок.
+    """
+
+    def __init__(self, prefix='load', seed=0, batch_size=1000):
+        self.prefix = prefix
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+
+    @transaction.atomic
+    def run(self, users, recipes, ingredients=(3, 12), tags=(1, 3),
+            favorites=10, cart=5, subscriptions=5):
+        ingredient_ids = list(Ingredient.objects.values_list('pk', flat=True))
+        tag_ids = list(Tag.objects.values_list('pk', flat=True))
+        user_ids = self.create_users(users)
+        recipe_ids = self.create_recipes(
+            user_ids, recipes, ingredient_ids, ingredients, tag_ids, tags
+        )
+        self.create_relations(
+            user_ids, recipe_ids, favorites, cart, subscriptions
+        )
+        self.analyze()
+        Recipe.objects.filter(pk__in=recipe_ids).update_search_vector()
+        recalculate_counters(
+            Recipe.objects.filter(pk__in=recipe_ids),
+            User.objects.filter(pk__in=user_ids)
+        )
+        return user_ids, recipe_ids
+
+    @staticmethod
+    def analyze():
+        """Обновляет статистику только что заполненных таблиц.
+
+        Без неё планировщик считает их почти пустыми, и пересчёт вектора
+        и счётчиков перебирает связи целиком для каждого рецепта.
+        """
+        tables = ', '.join(
+            connection.ops.quote_name(model._meta.db_table)
+            for model in (
+                User, Token, Recipe, Recipe.tags.through, IngredientInRecipe,
+                Favourite, ShoppingCart, ShoppingCartIngredient, Subscribe,
+            )
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {tables}')
+
+    def create_users(self, count):
+        offset = User.objects.filter(username__startswith=self.prefix).count()
+        password = make_password(PASSWORD)
+        usernames = [f'{self.prefix}{offset + i}' for i in range(count)]
+        User.objects.bulk_create(
+            [User(
+                username=username,
+                email=f'{username}@example.com',
+                first_name=self.rng.choice(('Анна', 'Иван', 'Мария', 'Олег')),
+                last_name=self.rng.choice(('Петрова', 'Смирнов', 'Орлова')),
+                password=password,
+            ) for username in usernames],
+            batch_size=self.batch_size
+        )
+        user_ids = list(User.objects.filter(
+            username__in=usernames
+        ).values_list('pk', flat=True))
+        Token.objects.bulk_create(
+            [Token(key=Token.generate_key(), user_id=user_id)
+             for user_id in user_ids],
+            batch_size=self.batch_size
+        )
+        return user_ids
+
+    def create_recipes(self, user_ids, count, ingredient_ids,
+                       ingredient_range, tag_ids, tag_range):
+        name = default_storage.save(
+            f'recipes/{self.prefix}.jpg', ContentFile(make_image())
+        )
+        renditions = make_renditions(name)
+        author_weights = zipf_weights(len(user_ids))
+        ingredient_weights = zipf_weights(len(ingredient_ids))
+        offset = Recipe.objects.filter(name__startswith=self.prefix).count()
+        names = [
+            f'{self.prefix}{offset + i} {self.rng.choice(ADJECTIVES)} '
+            f'{self.rng.choice(WORDS)}'
+            for i in range(count)
+        ]
+        Recipe.objects.bulk_create(
+            [Recipe(
+                author_id=self.rng.choices(user_ids, author_weights)[0],
+                name=recipe_name,
+                image=name,
+                renditions=renditions,
+                text=f'{recipe_name.capitalize()}. ' * 5,
+                cooking_time=self.rng.randint(5, 180),
+            ) for recipe_name in names],
+            batch_size=self.batch_size
+        )
+        recipe_ids = list(Recipe.objects.filter(
+            name__in=names
+        ).values_list('pk', flat=True))
+        amounts, recipe_tags = [], []
+        for recipe_id in recipe_ids:
+            amounts += [
+                IngredientInRecipe(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=self.rng.randint(1, 500)
+                )
+                for ingredient_id in skewed_sample(
+                    self.rng, ingredient_ids, ingredient_weights,
+                    self.rng.randint(*ingredient_range)
+                )
+            ]
+            recipe_tags += [
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for tag_id in self.rng.sample(
+                    tag_ids, min(len(tag_ids), self.rng.randint(*tag_range))
+                )
+            ]
+        IngredientInRecipe.objects.bulk_create(
+            amounts, batch_size=self.batch_size
+        )
+        Recipe.tags.through.objects.bulk_create(
+            recipe_tags, batch_size=self.batch_size
+        )
+        return recipe_ids
+
+    def create_relations(self, user_ids, recipe_ids, favorites, cart,
+                         subscriptions):
+        recipe_weights = zipf_weights(len(recipe_ids))
+        author_weights = zipf_weights(len(user_ids))
+        favourite_rows, cart_rows, subscribe_rows = [], [], []
+        carts = {}
+        for user_id in user_ids:
+            favourite_rows += [
+                Favourite(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id in skewed_sample(
+                    self.rng, recipe_ids, recipe_weights,
+                    self.rng.randint(0, 2 * favorites)
+                )
+            ]
+            carts[user_id] = skewed_sample(
+                self.rng, recipe_ids, recipe_weights,
+                self.rng.randint(0, 2 * cart)
+            )
+            cart_rows += [
+                ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id in carts[user_id]
+            ]
+            subscribe_rows += [
+                Subscribe(user_id=user_id, author_id=author_id)
+                for author_id in skewed_sample(
+                    self.rng, user_ids, author_weights,
+                    self.rng.randint(0, 2 * subscriptions)
+                ) if author_id != user_id
+            ]
+        for model, rows in ((Favourite, favourite_rows),
+                            (ShoppingCart, cart_rows),
+                            (Subscribe, subscribe_rows)):
+            model.objects.bulk_create(
+                rows, batch_size=self.batch_size, ignore_conflicts=True
+            )
+        for user_id, cart_recipe_ids in carts.items():
+            apply_cart_delta([user_id], recipe_amounts(cart_recipe_ids))
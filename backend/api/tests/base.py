@@ -0,0 +1,55 @@
+from contextlib import ExitStack
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase
+
+from api.benchmark import isolated_settings, load_reference_data, make_client
+from api.synthetic import Generator
+
+User = get_user_model()
+
+
+class IsolatedSettingsMixin:
+    """Настройки эталонного прогона на время всех тестов класса."""
+
+    @classmethod
+    def setUpClass(cls):
+        stack = ExitStack()
+        stack.enter_context(isolated_settings())
+        cls.addClassCleanup(stack.close)
+        super().setUpClass()
+
+
+class GeneratedDataTestCase(IsolatedSettingsMixin, TestCase):
+    """Тесты API на данных генератора в изолированном окружении.
+
+    Запросы от имени идут от пользователя с наибольшим числом подписок,
+    чтобы в ответах были и флаги, и авторы, на которых он подписан.
+    """
+    users = 10
+    recipes = 40
+
+    @classmethod
+    def setUpTestData(cls):
+        load_reference_data()
+        user_ids, cls.recipe_ids = Generator('tests', 0).run(
+            cls.users, cls.recipes, favorites=5, cart=3, subscriptions=3
+        )
+        cls.user = User.objects.filter(pk__in=user_ids).annotate(
+            subscriptions=Count('subscriber')
+        ).order_by('-subscriptions', 'pk').first()
+
+    def setUp(self):
+        cache.clear()
+        self.anonymous = make_client()
+        self.client = make_client(self.user.auth_token.key)
+
+
+class CommittedDataTestCase(IsolatedSettingsMixin, TransactionTestCase):
+    """Тесты, которым нужны настоящие коммиты и on_commit-обработчики."""
+
+    def setUp(self):
+        cache.clear()
+        load_reference_data()
@@ -0,0 +1,21 @@
+from api.benchmark import Suite, load_baselines
+
+from .base import CommittedDataTestCase
+
+
+class BenchmarkBaselineTests(CommittedDataTestCase):
+    """Число SQL-запросов в сценариях не превышает эталонов.
+
+    Время зависит от машины и проверяется только командой benchmark.
+    """
+
+    def test_queries_within_baselines(self):
+        baselines = load_baselines()
+        suite = Suite()
+        for name in Suite.scenarios:
+            with self.subTest(scenario=name):
+                self.assertIn(name, baselines)
+                self.assertLessEqual(
+                    suite.run(name, repeat=2)['queries'],
+                    baselines[name]['queries']
+                )
@@ -0,0 +1,47 @@
+from base64 import b64encode, encodebytes
+
+from django.test import SimpleTestCase, override_settings
+from rest_framework.exceptions import ValidationError
+
+from api.fields import StreamingBase64ImageField
+from api.synthetic import make_image
+
+
+@override_settings(IMAGE_DECODE_CHUNK=1000)
+class StreamingBase64ImageFieldTests(SimpleTestCase):
+
+    def setUp(self):
+        self.image = make_image()
+        self.field = StreamingBase64ImageField()
+
+    def decode(self, encoded):
+        uploaded = self.field.to_internal_value(
+            'data:image/jpeg;base64,' + encoded
+        )
+        with uploaded:
+            return uploaded.read()
+
+    def test_plain_base64(self):
+        self.assertEqual(
+            self.decode(b64encode(self.image).decode()), self.image
+        )
+
+    def test_line_wrapped_base64(self):
+        for separator in ('\n', '\r\n'):
+            with self.subTest(separator=separator):
+                encoded = encodebytes(self.image).decode().replace(
+                    '\n', separator
+                )
+                self.assertEqual(self.decode(encoded), self.image)
+
+    def test_invalid_base64(self):
+        encoded = b64encode(self.image).decode()
+        for broken in (encoded[:-1], encoded[:500] + '!' + encoded[500:]):
+            with self.subTest(length=len(broken)):
+                with self.assertRaises(ValidationError):
+                    self.decode(broken)
+
+    def test_too_large(self):
+        with self.settings(IMAGE_MAX_UPLOAD_SIZE=len(self.image) - 1):
+            with self.assertRaises(ValidationError):
+                self.decode(b64encode(self.image).decode())
@@ -0,0 +1,24 @@
+from recipes.models import Ingredient
+
+from .base import GeneratedDataTestCase
+
+
+class IngredientListTests(GeneratedDataTestCase):
+
+    def test_blank_name_returns_full_list(self):
+        full = self.anonymous.get('/api/ingredients/')
+        for name in ('', '  '):
+            with self.subTest(name=name):
+                response = self.anonymous.get(
+                    '/api/ingredients/', {'name': name}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), full.json())
+
+    def test_name_searches_by_prefix(self):
+        ingredient = Ingredient.objects.order_by('pk').first()
+        response = self.anonymous.get(
+            '/api/ingredients/', {'name': ingredient.name}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(ingredient.pk, [item['id'] for item in response.json()])
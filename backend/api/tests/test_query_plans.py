@@ -0,0 +1,23 @@
+from django.test import TestCase
+
+from api.benchmark import load_reference_data
+from api.query_plans import HotQueries
+
+from .base import IsolatedSettingsMixin
+
+
+class HotQueryPlanTests(IsolatedSettingsMixin, TestCase):
+    """Горячие запросы читают таблицы по индексам, а не целиком.
+
+    Данных столько же, сколько по умолчанию у check_query_plans: на
+    меньшей базе планировщику выгоднее полный просмотр.
+    """
+    users = 500
+    recipes = 5000
+
+    def test_hot_queries_use_indexes(self):
+        load_reference_data()
+        results = HotQueries(self.users, self.recipes).check()
+        for name, (plan, seq_scans) in results.items():
+            with self.subTest(query=name):
+                self.assertEqual(seq_scans, [], plan)
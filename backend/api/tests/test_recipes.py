@@ -0,0 +1,103 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+
+from api.benchmark import make_client
+from api.query_budget import QueryBudget
+from api.synthetic import Generator
+
+from .base import CommittedDataTestCase, GeneratedDataTestCase
+
+User = get_user_model()
+
+LIST_BUDGET = 4
+DETAIL_BUDGET = 3
+
+
+class RecipeListQueriesTests(GeneratedDataTestCase):
+
+    def count_queries(self, client, limit):
+        with QueryBudget(LIST_BUDGET) as queries:
+            response = client.get('/api/recipes/', {'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), limit)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for client in (self.anonymous, self.client):
+            with self.subTest(authenticated=client is self.client):
+                client.get('/api/recipes/', {'limit': 1})
+                self.assertEqual(
+                    self.count_queries(client, 6),
+                    self.count_queries(client, 24)
+                )
+
+
+class RecipeQueryBudgetTests(GeneratedDataTestCase):
+
+    def assertWithinBudget(self, client, path, budget):
+        client.get(path)
+        with QueryBudget(budget):
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list(self):
+        for client in (self.anonymous, self.client):
+            with self.subTest(authenticated=client is self.client):
+                self.assertWithinBudget(
+                    client, '/api/recipes/?limit=6', LIST_BUDGET
+                )
+
+    def test_detail(self):
+        self.assertWithinBudget(
+            self.client, f'/api/recipes/{self.recipe_ids[0]}/', DETAIL_BUDGET
+        )
+
+
+class RecipeCursorPaginationTests(GeneratedDataTestCase):
+
+    def test_cursor_mode_pages_by_id(self):
+        response = self.anonymous.get(
+            '/api/recipes/', {'pagination': 'cursor'}
+        )
+        self.assertNotIn('count', response.data)
+        ids = [recipe['id'] for recipe in response.data['results']]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_other_ordering_falls_back_to_pages(self):
+        response = self.anonymous.get('/api/recipes/', {
+            'pagination': 'cursor', 'ordering': 'popular', 'limit': 24
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], self.recipes)
+        counts = [
+            recipe['favorites_count'] for recipe in response.data['results']
+        ]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+        self.assertIn('page=2', response.data['next'])
+
+
+class RecipeCacheTests(CommittedDataTestCase):
+    """Кэш представлений читается и пишется пачкой на всю страницу."""
+
+    def setUp(self):
+        super().setUp()
+        user_ids, _ = Generator('cache', 0).run(
+            5, 12, favorites=3, cart=2, subscriptions=2
+        )
+        user = User.objects.get(pk=user_ids[0])
+        self.client = make_client(user.auth_token.key)
+
+    def test_list_uses_batched_cache_calls(self):
+        path = '/api/recipes/?limit=12'
+        cold = self.client.get(path)
+        with mock.patch('api.cache.cache', wraps=caches['default']) as cache:
+            self.client.get(path)
+        self.assertEqual(cache.set.call_count, 0)
+        self.assertEqual(len(cache.set_many.call_args.args[0]), 12)
+        with mock.patch('api.cache.cache', wraps=caches['default']) as cache:
+            warm = self.client.get(path)
+        self.assertEqual(cache.get.call_count, 0)
+        self.assertEqual(cache.get_many.call_count, 2)
+        self.assertEqual(warm.json(), cold.json())
@@ -0,0 +1,21 @@
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+
+    def assertRendersLikeDRF(self, data):
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_matches_drf(self):
+        self.assertRendersLikeDRF({
+            'id': 1, 'name': 'Щи', 'text': 'a\u2028b', 'tags': [],
+            'author': None, 'is_favorited': False,
+        })
+
+    def test_wide_integers_fall_back_to_drf(self):
+        self.assertRendersLikeDRF({'id': 2 ** 70})
@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe
+
+from .base import CommittedDataTestCase
+
+User = get_user_model()
+
+
+class SearchVectorTests(CommittedDataTestCase):
+    """search_vector следует за правками в обход API."""
+
+    def setUp(self):
+        super().setUp()
+        self.ingredients = list(Ingredient.objects.order_by('pk')[:2])
+        self.recipe = Recipe.objects.create(
+            author=User.objects.create(
+                username='cook', email='cook@example.com'
+            ),
+            name='Борщ',
+            text='Красный суп.',
+            image='recipes/borsch.jpg',
+            cooking_time=60
+        )
+
+    def check(self):
+        call_command('rebuild_search_vectors', '--check', stdout=StringIO())
+
+    def search(self, text):
+        return list(Recipe.objects.search(text).values_list('pk', flat=True))
+
+    def test_orm_edits_update_vector(self):
+        self.check()
+        row = IngredientInRecipe.objects.create(
+            recipe=self.recipe, ingredient=self.ingredients[0], amount=1
+        )
+        self.check()
+        row.ingredient = self.ingredients[1]
+        row.save()
+        self.check()
+        self.recipe.name = 'Щи'
+        self.recipe.save()
+        self.check()
+        self.assertEqual(self.search('щи'), [self.recipe.pk])
+        row.delete()
+        self.check()
+
+    def test_rebuild_fixes_stale_vectors(self):
+        Recipe.objects.update(search_vector=None)
+        with self.assertRaises(CommandError):
+            self.check()
+        call_command('rebuild_search_vectors', stdout=StringIO())
+        self.check()
+        self.assertEqual(self.search('борщ'), [self.recipe.pk])
@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+
+from api.benchmark import make_client
+from api.synthetic import Generator
+from recipes.models import Ingredient, Recipe
+
+from .base import CommittedDataTestCase
+
+User = get_user_model()
+
+ROUNDS = 6
+
+
+class ShoppingCartTotalsTests(CommittedDataTestCase):
+    """Итоги корзин не расходятся с рецептами при параллельных правках."""
+
+    def setUp(self):
+        super().setUp()
+        user_ids, recipe_ids = Generator('cart', 0).run(
+            6, 4, favorites=0, cart=0, subscriptions=0
+        )
+        self.recipe_ids = recipe_ids[:2]
+        self.authors = {
+            recipe.pk: make_client(recipe.author.auth_token.key)
+            for recipe in Recipe.objects.filter(pk__in=self.recipe_ids)
+        }
+        self.buyers = [
+            make_client(user.auth_token.key)
+            for user in User.objects.filter(pk__in=user_ids)
+        ]
+        self.ingredient_ids = list(
+            Ingredient.objects.values_list('pk', flat=True)[:4]
+        )
+
+    def in_thread(self, flow):
+        try:
+            flow()
+        finally:
+            connections.close_all()
+
+    def toggle_cart(self, client):
+        for _ in range(ROUNDS):
+            client.post('/api/recipes/bulk_shopping_cart/', {
+                'recipes': self.recipe_ids
+            }, content_type='application/json')
+            client.delete(f'/api/recipes/{self.recipe_ids[0]}/shopping_cart/')
+            client.post(f'/api/recipes/{self.recipe_ids[0]}/shopping_cart/')
+            client.delete('/api/recipes/bulk_shopping_cart/', {
+                'recipes': self.recipe_ids[1:]
+            }, content_type='application/json')
+
+    def edit_ingredients(self, recipe_id, client):
+        for number in range(ROUNDS):
+            ingredient_ids = self.ingredient_ids[number % 2:][:3]
+            response = client.patch(f'/api/recipes/{recipe_id}/', {
+                'ingredients': [
+                    {'id': pk, 'amount': 10 * (number + position)}
+                    for position, pk in enumerate(ingredient_ids, 1)
+                ]
+            }, content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+
+    def test_concurrent_cart_and_ingredient_edits_keep_totals(self):
+        flows = [
+            lambda client=client: self.toggle_cart(client)
+            for client in self.buyers
+        ] + [
+            lambda pk=pk, client=client: self.edit_ingredients(pk, client)
+            for pk, client in self.authors.items()
+        ]
+        with ThreadPoolExecutor(len(flows)) as executor:
+            for future in [
+                executor.submit(self.in_thread, flow) for flow in flows
+            ]:
+                future.result()
+        call_command('rebuild_shopping_carts', '--check', stdout=StringIO())
@@ -0,0 +1,16 @@
+from api.query_budget import QueryBudget
+
+from .base import GeneratedDataTestCase
+
+SUBSCRIPTIONS_BUDGET = 3
+
+
+class SubscriptionsQueryBudgetTests(GeneratedDataTestCase):
+
+    def test_subscriptions(self):
+        path = '/api/users/subscriptions/?recipes_limit=3'
+        self.client.get(path)
+        with QueryBudget(SUBSCRIPTIONS_BUDGET):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'])
@@ -1,28 +1,42 @@
-from datetime import datetime
+from functools import partial
+from itertools import chain
+from time import time_ns
 
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Prefetch, Value
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status
-from rest_framework.decorators import action
-from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       renderer_classes)
+from rest_framework.permissions import (SAFE_METHODS, AllowAny, IsAdminUser,
+                                        IsAuthenticated)
 from rest_framework.response import Response
 from rest_framework.status import HTTP_400_BAD_REQUEST
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from recipes.models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
-                            ShoppingCart, Tag)
+from recipes.models import Favourite, Ingredient, Recipe, ShoppingCart, Tag
+from .cache import INGREDIENTS_VERSION, TAGS_VERSION, ReferenceCacheMixin
+from .counters import change_counter
 from .filters import IngredientFilter, RecipeFilter
+from .ingredient_index import get_index
+from .metrics import PrometheusRenderer, registry
 from .pagination import CustomPagination
 from .permissions import IsAuthorOrReadOnly
-from .serializers import (CustomUserSerializer, FavouriteSerializer,
-                          IngredientSerializer, RecipeReadSerializer,
-                          RecipeWriteSerializer, ShoppingCartSerializer,
+from .serializers import (BulkRecipesSerializer, CustomUserSerializer,
+                          FavouriteSerializer, IngredientSearchSerializer,
+                          IngredientSerializer, RecipeDetailSerializer,
+                          RecipeReadSerializer, RecipeShortSerializer,
+                          RecipesLimitSerializer, RecipeWriteSerializer,
+                          ShoppingCartIngredientSerializer,
+                          ShoppingCartSerializer, ShoppingListFormatSerializer,
                           SubscribePostSerializer, SubscribeSerializer,
                           TagSerializer)
+from .shopping_list import (FORMATS, add_to_cart_totals, get_rows,
+                            lock_recipes, remove_from_cart_totals)
 
 User = get_user_model()
 
@@ -32,12 +46,24 @@ class CustomUserViewSet(UserViewSet):
     serializer_class = CustomUserSerializer
     pagination_class = CustomPagination
 
+    def get_recipes_limit(self):
+        serializer = RecipesLimitSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data.get('recipes_limit')
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'subscribe':
+            context['recipes_limit'] = self.get_recipes_limit()
+        return context
+
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
         permission_classes=[IsAuthenticated],
         serializer_class=SubscribePostSerializer
     )
+    @transaction.atomic
     def subscribe(self, request, id=None):
         user = request.user
         author = get_object_or_404(User, pk=id)
@@ -49,36 +75,79 @@ class CustomUserViewSet(UserViewSet):
             serializer = self.get_serializer(data=data)
             serializer.is_valid(raise_exception=True)
             serializer.save(user=user, author=author)
+            self.change_subscribers_count(author, 1)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        subscription = user.subscriber.filter(author=author)
-        subscription.delete()
+        deleted, _ = user.subscriber.filter(author=author).delete()
+        if not deleted:
+            return Response(
+                {'errors': 'Вы не подписаны на этого пользователя!'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        self.change_subscribers_count(author, -1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @staticmethod
+    def change_subscribers_count(author, delta):
+        change_counter(
+            User.objects.filter(pk=author.pk), 'subscribers_count', delta
+        )
+        author.refresh_from_db(fields=('subscribers_count',))
+
     @action(
         detail=False,
         permission_classes=[IsAuthenticated]
     )
     def subscriptions(self, request):
-        queryset = User.objects.filter(subscribing__user=request.user)
+        recipes_limit = self.get_recipes_limit()
+        queryset = User.objects.filter(
+            subscribing__user=request.user
+        ).annotate(
+            is_subscribed=Value(True),
+        ).order_by('id').prefetch_related(
+            Prefetch(
+                'recipes',
+                queryset=Recipe.objects.limited_per_author(recipes_limit),
+                to_attr='limited_recipes',
+            )
+        )
         pages = self.paginate_queryset(queryset)
-        serializer = SubscribeSerializer(pages,
-                                         many=True,
-                                         context={'request': request})
+        serializer = SubscribeSerializer(
+            pages,
+            many=True,
+            context={'request': request, 'recipes_limit': recipes_limit}
+        )
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(ReferenceCacheMixin, ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
+    cache_version_name = INGREDIENTS_VERSION
+
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('name', '').strip():
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(
+            request, partial(self.search, request), store=False
+        )
+
+    def search(self, request):
+        serializer = IngredientSearchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return Response(get_index().search(
+            data['name'], data['limit'], data['fuzzy']
+        ))
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(ReferenceCacheMixin, ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
+    cache_version_name = TAGS_VERSION
 
 
 class RecipeViewSet(ModelViewSet):
@@ -88,36 +157,86 @@ class RecipeViewSet(ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def initial(self, request, *args, **kwargs):
+        self.cache_snapshot = time_ns()
+        super().initial(request, *args, **kwargs)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['cache_snapshot'] = getattr(self, 'cache_snapshot', None)
+        return context
+
+    def get_queryset(self):
+        if self.request.method not in SAFE_METHODS:
+            return Recipe.objects.defer('search_vector')
+        return Recipe.objects.with_related().with_user_flags(
+            self.request.user
+        )
+
     def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return RecipeDetailSerializer
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        lock_recipes([instance.pk])
+        remove_from_cart_totals(
+            instance.shopping_cart.values_list('user_id', flat=True),
+            [instance.id]
+        )
+        change_counter(
+            User.objects.filter(pk=instance.author_id), 'recipes_count', -1
+        )
+        instance.delete()
+
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
         permission_classes=[IsAuthenticated]
     )
+    @transaction.atomic
     def favorite(self, request, pk):
+        lock_recipes([pk])
+        self.lock_user(request.user)
         if request.method == 'POST':
-            return self.add_to(
+            response = self.add_to(
                 FavouriteSerializer, request.user, pk,
                 error_message='Вы уже подписаны на этого автора'
             )
-        return self.delete_from(Favourite, request.user, pk)
+            delta = 1
+        else:
+            response = self.delete_from(Favourite, request.user, pk)
+            if response.status_code != status.HTTP_204_NO_CONTENT:
+                return response
+            delta = -1
+        change_counter(
+            Recipe.objects.filter(pk=pk), 'favorites_count', delta
+        )
+        return response
 
     @action(
         detail=True,
         methods=['POST', 'DELETE'],
         permission_classes=[IsAuthenticated]
     )
+    @transaction.atomic
     def shopping_cart(self, request, pk):
+        lock_recipes([pk])
+        self.lock_user(request.user)
         if request.method == 'POST':
-            return self.add_to(
+            response = self.add_to(
                 ShoppingCartSerializer, request.user, pk,
                 error_message='Рецепт уже находится в списке покупок'
             )
-        return self.delete_from(ShoppingCart, request.user, pk)
+            add_to_cart_totals([request.user.id], [pk])
+            return response
+        response = self.delete_from(ShoppingCart, request.user, pk)
+        if response.status_code == status.HTTP_204_NO_CONTENT:
+            remove_from_cart_totals([request.user.id], [pk])
+        return response
 
     @staticmethod
     def add_to(create_serializer, user, pk, error_message):
@@ -133,44 +252,163 @@ class RecipeViewSet(ModelViewSet):
 
     @staticmethod
     def delete_from(model, user, pk):
-        obj = model.objects.filter(user=user, recipe__id=pk)
-        if obj.exists():
-            obj.delete()
+        deleted, _ = model.objects.filter(user=user, recipe_id=pk).delete()
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response({'errors': 'Рецепт уже удален!'},
                         status=status.HTTP_400_BAD_REQUEST)
 
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        permission_classes=[IsAuthenticated]
+    )
+    @transaction.atomic
+    def bulk_favorite(self, request):
+        recipe_ids = self.get_bulk_recipe_ids(request)
+        lock_recipes(recipe_ids)
+        self.lock_user(request.user)
+        if request.method == 'POST':
+            response = self.bulk_add_to(Favourite, request, recipe_ids)
+            changed, delta = self.with_status(response, 'created'), 1
+        else:
+            response = self.bulk_delete_from(
+                Favourite, request.user, recipe_ids
+            )
+            changed, delta = self.with_status(response, 'deleted'), -1
+        change_counter(
+            Recipe.objects.filter(pk__in=changed), 'favorites_count', delta
+        )
+        return response
+
+    @action(
+        detail=False,
+        methods=['POST', 'DELETE'],
+        permission_classes=[IsAuthenticated]
+    )
+    @transaction.atomic
+    def bulk_shopping_cart(self, request):
+        recipe_ids = self.get_bulk_recipe_ids(request)
+        lock_recipes(recipe_ids)
+        self.lock_user(request.user)
+        if request.method == 'POST':
+            response = self.bulk_add_to(ShoppingCart, request, recipe_ids)
+            add_to_cart_totals(
+                [request.user.id], self.with_status(response, 'created')
+            )
+            return response
+        response = self.bulk_delete_from(
+            ShoppingCart, request.user, recipe_ids
+        )
+        remove_from_cart_totals(
+            [request.user.id], self.with_status(response, 'deleted')
+        )
+        return response
+
+    @staticmethod
+    def lock_user(user):
+        """Выстраивает в очередь изменения избранного и корзины пользователя.
+
+        Иначе параллельный запрос может вставить ту же строку между
+        проверкой и вставкой, и итоги посчитаются дважды, а одиночная
+        вставка и массовая могут заблокировать друг друга. Вызывается
+        после lock_recipes: рецепты всегда блокируются первыми.
+        """
+        list(User.objects.select_for_update().filter(
+            pk=user.pk
+        ).values_list('pk', flat=True))
+
+    @staticmethod
+    def with_status(response, item_status):
+        return [
+            item['id'] for item in response.data['results']
+            if item['status'] == item_status
+        ]
+
+    @staticmethod
+    def get_bulk_recipe_ids(request):
+        serializer = BulkRecipesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['recipes']
+
+    def bulk_add_to(self, model, request, recipe_ids):
+        recipes = Recipe.objects.defer('search_vector').in_bulk(recipe_ids)
+        existing = set(model.objects.filter(
+            user=request.user, recipe_id__in=recipes
+        ).values_list('recipe_id', flat=True))
+        model.objects.bulk_create(
+            [model(user=request.user, recipe_id=recipe_id)
+             for recipe_id in recipes if recipe_id not in existing],
+            ignore_conflicts=True
+        )
+        context = self.get_serializer_context()
+        results = []
+        for recipe_id in recipe_ids:
+            if recipe_id not in recipes:
+                results.append({'id': recipe_id, 'status': 'not_found'})
+                continue
+            results.append({
+                'id': recipe_id,
+                'status': 'exists' if recipe_id in existing else 'created',
+                'recipe': RecipeShortSerializer(
+                    recipes[recipe_id], context=context
+                ).data,
+            })
+        return Response({'results': results})
+
+    @staticmethod
+    def bulk_delete_from(model, user, recipe_ids):
+        entries = model.objects.filter(user=user, recipe_id__in=recipe_ids)
+        deleted = set(entries.values_list('recipe_id', flat=True))
+        if deleted:
+            entries.delete()
+        return Response({'results': [
+            {
+                'id': recipe_id,
+                'status': 'deleted' if recipe_id in deleted else 'not_found',
+            }
+            for recipe_id in recipe_ids
+        ]})
+
     @action(
         detail=False,
         permission_classes=[IsAuthenticated]
     )
     def download_shopping_cart(self, request):
         user = request.user
-        if not user.shopping_cart.exists():
+        serializer = ShoppingListFormatSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        file_type = serializer.validated_data['type']
+        content_type, render = FORMATS[file_type]
+
+        rows = iter(get_rows(user))
+        first_row = next(rows, None)
+        if first_row is None:
             return Response(status=HTTP_400_BAD_REQUEST)
 
-        ingredients = IngredientInRecipe.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
-
-        today = datetime.today()
-        shopping_list = (
-            f'Список покупок для: {user.get_full_name()}\n\n'
-            f'Дата: {today:%Y-%m-%d}\n\n'
+        filename = f'{user.username}_shopping_list.{file_type}'
+        response = StreamingHttpResponse(
+            render(user, chain((first_row,), rows)),
+            content_type=content_type
         )
-        shopping_list += '\n'.join([
-            f'- {ingredient["ingredient__name"]} '
-            f'({ingredient["ingredient__measurement_unit"]})'
-            f' - {ingredient["amount"]}'
-            for ingredient in ingredients
-        ])
-        shopping_list += f'\n\nFoodgram ({today:%Y})'
-
-        filename = f'{user.username}_shopping_list.txt'
-        response = HttpResponse(shopping_list, content_type='text/plain')
         response['Content-Disposition'] = f'attachment; filename={filename}'
 
         return response
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_summary(self, request):
+        ingredients = request.user.shopping_cart_ingredients.select_related(
+            'ingredient'
+        ).order_by('ingredient__name')
+        serializer = ShoppingCartIngredientSerializer(ingredients, many=True)
+        return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+@renderer_classes([PrometheusRenderer])
+def metrics(request):
+    return Response(registry.render())
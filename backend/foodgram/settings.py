@@ -22,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework.authtoken',
     'rest_framework',
     'djoser',
@@ -32,6 +33,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,15 +65,34 @@ WSGI_APPLICATION = 'foodgram.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'foodgram.postgresql',
         'NAME': os.getenv('POSTGRES_DB', 'foodgram'),
         'USER': os.getenv('POSTGRES_USER', 'foodgram_user'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'foodgram_password'),
         'HOST': os.getenv('DB_HOST', 'db'),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': strtobool(
+            os.getenv('DB_CONN_HEALTH_CHECKS', default='True')
+        ),
+        'DISABLE_SERVER_SIDE_CURSORS': strtobool(
+            os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', default='False')
+        ),
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -95,7 +116,18 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
@@ -166,3 +198,89 @@ MAX_LENGHT_USER_EMAIL = 254
 REQES = '^#([A-Fa-f0-9]{6}|[A-Fa-f0-9]{3})$'
 
 MIN_VAL = 1
+
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+
+SHOPPING_LIST_CHUNK_SIZE = 500
+
+SHOPPING_LIST_PDF_CHUNK = 64 * 1024
+
+SHOPPING_LIST_FONT = os.getenv(
+    'SHOPPING_LIST_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+INGREDIENT_SEARCH_LIMIT = 20
+
+INGREDIENT_SEARCH_MAX_LIMIT = 100
+
+INGREDIENT_SEARCH_FUZZY = False
+
+INGREDIENT_SEARCH_SIMILARITY = 0.3
+
+SEARCH_CONFIG = 'russian'
+
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+
+RECIPE_CACHE_TIMEOUT = 60 * 60 * 24
+
+IMAGE_MAX_UPLOAD_SIZE = 15 * 1024 * 1024
+
+IMAGE_MAX_PIXELS = 40_000_000
+
+IMAGE_DECODE_CHUNK = 64 * 1024
+
+IMAGE_SPOOL_MAX_SIZE = 1024 * 1024
+
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
+IMAGE_RENDITIONS = {
+    'thumbnail': (160, 160, True),
+    'card': (480, 320, True),
+    'detail': (1200, 1200, False),
+}
+
+IMAGE_RENDITIONS_DIR = 'recipes/renditions'
+
+IMAGE_RENDITION_FORMAT = 'WEBP'
+
+IMAGE_RENDITION_QUALITY = 80
+
+IMAGE_RENDITION_METHOD = 4
+
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 0.1))
+
+METRICS_DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+METRICS_SQL_PREVIEW = 200
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.metrics': {
+            'handlers': ['console'],
+            'level': os.getenv('METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+BULK_RECIPES_MAX = 100
+
+ASYNC_READ_VIEWS = strtobool(os.getenv('ASYNC_READ_VIEWS', default='False'))
+
+AUTH_TOKEN_CACHE_SIZE = 10000
+
+AUTH_TOKEN_LOCAL_TIMEOUT = int(os.getenv('AUTH_TOKEN_LOCAL_TIMEOUT', 30))
+
+AUTH_TOKEN_CACHE_ALIAS = os.getenv(
+    'AUTH_TOKEN_CACHE_ALIAS', default='default'
+) or None
+
+AUTH_TOKEN_CACHE_TIMEOUT = 60 * 5
@@ -3,7 +3,7 @@ from django.contrib.admin import ModelAdmin, TabularInline, display
 from django.utils.safestring import mark_safe
 
 from .models import (Favourite, Ingredient, IngredientInRecipe, Recipe,
-                     ShoppingCart, Tag)
+                     ShoppingCart, ShoppingCartIngredient, Tag)
 
 
 class RecipeIngredientsInLine(TabularInline):
@@ -30,7 +30,7 @@ class RecipeAdmin(ModelAdmin):
 
     @display(description='Количество в избранных')
     def added_in_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     @display(description='Ингредиенты')
     def get_ingredients(self, obj):
@@ -71,6 +71,15 @@ class ShoppingCartAdmin(ModelAdmin):
     )
 
 
+@admin.register(ShoppingCartIngredient)
+class ShoppingCartIngredientAdmin(ModelAdmin):
+    list_display = (
+        'user',
+        'ingredient',
+        'amount',
+    )
+
+
 @admin.register(Favourite)
 class FavouriteAdmin(ModelAdmin):
     list_display = (
@@ -1,11 +1,21 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, SearchVectorField,
+                                            TrigramSimilarity)
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
-from django.db.models import (CASCADE, CharField, ForeignKey, ImageField,
-                              ManyToManyField, Model,
-                              PositiveSmallIntegerField, SlugField, TextField,
-                              UniqueConstraint)
+from django.db.models import (CASCADE, CharField, Exists, F, ForeignKey,
+                              ImageField, JSONField, ManyToManyField, Model,
+                              OuterRef, PositiveIntegerField,
+                              PositiveSmallIntegerField, Prefetch, Q, QuerySet,
+                              SlugField, Subquery, TextField, UniqueConstraint,
+                              Value)
+from django.db.models.functions import Cast, Coalesce
+
+from users.models import ManagedFieldsMixin, Subscribe
 
 User = get_user_model()
 
@@ -63,6 +73,13 @@ class Ingredient(Model):
                 name='unique_name_measurement_unit',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('name',),
+                name='ingredient_name_prefix_idx',
+                opclasses=('varchar_pattern_ops',),
+            ),
+        )
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ['name']
@@ -71,7 +88,102 @@ class Ingredient(Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
-class Recipe(Model):
+class RecipeQuerySet(QuerySet):
+
+    def with_related(self):
+        return self.defer('search_vector').select_related(
+            'author'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredient_list',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient'
+                )
+            ),
+        )
+
+    def limited_per_author(self, limit):
+        recipes = self.defer('search_vector')
+        if limit is None:
+            return recipes
+        if not limit:
+            return recipes.none()
+        return recipes.filter(pk__in=Subquery(
+            Recipe.objects.filter(
+                author=OuterRef('author')
+            ).values('pk')[:limit]
+        ))
+
+    @staticmethod
+    def fresh_search_vector():
+        ingredient_names = Ingredient.objects.filter(
+            recipes=OuterRef('pk')
+        ).order_by().values('recipes').annotate(
+            names=StringAgg('name', delimiter=' ')
+        ).values('names')
+        return (
+            SearchVector(
+                'name', weight='A', config=settings.SEARCH_CONFIG
+            )
+            + SearchVector(
+                'text', weight='B', config=settings.SEARCH_CONFIG
+            )
+            + SearchVector(
+                Coalesce(Subquery(ingredient_names), Value('')),
+                weight='C',
+                config=settings.SEARCH_CONFIG
+            )
+        )
+
+    def update_search_vector(self):
+        return self.update(search_vector=self.fresh_search_vector())
+
+    def with_stale_search_vector(self):
+        # Точное сравнение у SearchVectorField занято под поиск (@@),
+        # поэтому векторы сравниваются в текстовом виде.
+        return self.alias(
+            stored_search_vector=Cast('search_vector', TextField()),
+            fresh_search_vector=Cast(
+                self.fresh_search_vector(), TextField()
+            ),
+        ).filter(
+            Q(search_vector__isnull=True)
+            | ~Q(stored_search_vector=F('fresh_search_vector'))
+        )
+
+    def search(self, text):
+        query = SearchQuery(
+            text, config=settings.SEARCH_CONFIG, search_type='websearch'
+        )
+        return self.annotate(
+            rank=SearchRank(F('search_vector'), query),
+            similarity=TrigramSimilarity('name', text),
+        ).filter(
+            Q(search_vector=query) | Q(name__trigram_similar=text)
+        ).order_by('-rank', '-similarity', '-id')
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+                author_is_subscribed=Value(False),
+            )
+        return self.annotate(
+            is_favorited=Exists(Favourite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            author_is_subscribed=Exists(Subscribe.objects.filter(
+                user=user, author=OuterRef('author')
+            )),
+        )
+
+
+class Recipe(ManagedFieldsMixin, Model):
     tags = ManyToManyField(
         Tag,
         related_name='recipes',
@@ -117,8 +229,50 @@ class Recipe(Model):
         ]
     )
 
+    renditions = JSONField(
+        verbose_name='Уменьшенные копии изображения',
+        default=dict,
+        blank=True,
+        editable=False
+    )
+
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    favorites_count = PositiveIntegerField(
+        verbose_name='Количество в избранном',
+        default=0,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    managed_fields = ('favorites_count', 'renditions', 'search_vector')
+
     class Meta:
         ordering = ['-id']
+        indexes = [
+            GinIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_idx'
+            ),
+            GinIndex(
+                fields=['name'],
+                name='recipe_name_trgm_idx',
+                opclasses=['gin_trgm_ops']
+            ),
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipe_popularity_idx'
+            ),
+            models.Index(
+                fields=['author', '-id'],
+                name='recipe_author_id_idx'
+            ),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -151,6 +305,13 @@ class Favourite(Model):
                 name='unique_favorite'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe'],
+                include=['user'],
+                name='favorite_recipe_user_idx'
+            )
+        ]
 
     def __str__(self):
         return f'{self.user} добавил "{self.recipe}" в Избранное'
@@ -181,6 +342,13 @@ class ShoppingCart(Model):
                 name='unique_shopping_cart'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe'],
+                include=['user'],
+                name='shopping_cart_recipe_user_idx'
+            )
+        ]
 
     def __str__(self):
         return f'{self.user} добавил "{self.recipe}" в Список покупок'
@@ -222,3 +390,37 @@ class IngredientInRecipe(Model):
             ({self.ingredient.measurement_unit}) -
             {self.amount}'''
         )
+
+
+class ShoppingCartIngredient(Model):
+    user = ForeignKey(
+        User,
+        on_delete=CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name='Пользователь',
+        help_text='Пользователь'
+    )
+    ingredient = ForeignKey(
+        Ingredient,
+        on_delete=CASCADE,
+        related_name='shopping_cart_totals',
+        verbose_name='Ингредиент',
+        help_text='Ингредиент'
+    )
+    amount = PositiveIntegerField(
+        verbose_name='Количество',
+        help_text='Количество'
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списке покупок'
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_cart_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} - {self.amount}'
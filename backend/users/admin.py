@@ -12,6 +12,8 @@ class UserAdmin(UserAdmin):
         'first_name',
         'last_name',
         'email',
+        'recipes_count',
+        'subscribers_count',
     )
     list_filter = (
         'email',
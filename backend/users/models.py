@@ -2,10 +2,31 @@ from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
 from django.db.models import (CASCADE, CharField, EmailField, ForeignKey,
-                              Model, UniqueConstraint)
+                              Model, PositiveIntegerField, UniqueConstraint)
 
 
-class User(AbstractUser):
+class ManagedFieldsMixin:
+    """Не даёт save() затереть поля, которые меняются только через update().
+
+    Это счётчики, которые сдвигаются через F(), и поля, которые заполняют
+    фоновые задачи. При обновлении существующей строки сохраняются все
+    поля, кроме перечисленных в ``managed_fields``.
+    """
+    managed_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (not args and not self._state.adding
+                and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.managed_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(ManagedFieldsMixin, AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = [
         'username',
@@ -21,6 +42,18 @@ class User(AbstractUser):
         verbose_name='Пароль',
         max_length=settings.MAX_LENGHT_USER_PASSWORD,
     )
+    recipes_count = PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    subscribers_count = PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False,
+    )
+
+    managed_fields = ('recipes_count', 'subscribers_count')
 
     class Meta:
         ordering = ['id']